@@ -2,11 +2,30 @@ import streamlit as st
 import networkx as nx
 import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
 from io import StringIO
+from scipy.sparse import csr_array
+from scipy.sparse.csgraph import dijkstra
 
 # Page configuration
 st.set_page_config(page_title="Social Network Graph", layout="wide")
 
+def bump_graph_version():
+    """Mark the graph as changed so per-graph session caches get rebuilt."""
+    st.session_state.graph_version = st.session_state.get('graph_version', 0) + 1
+
+def node_options():
+    """["None"] + sorted nodes for the sidebar selectboxes, re-sorted only when the graph changes."""
+    if st.session_state.get('node_options_version') != st.session_state.graph_version:
+        st.session_state.node_options = ["None"] + sorted(st.session_state.graph.nodes())
+        st.session_state.node_options_version = st.session_state.graph_version
+    return st.session_state.node_options
+
+def remember_original(G):
+    """Keep the graph's node/edge tuples (not a full graph copy) for the reset button."""
+    st.session_state.original_nodes = tuple(G.nodes())
+    st.session_state.original_edges = tuple(G.edges())
+
 # Initialize session state
 if 'graph' not in st.session_state:
     # Sample data
@@ -17,7 +36,8 @@ if 'graph' not in st.session_state:
     ]
     st.session_state.graph = nx.Graph()
     st.session_state.graph.add_edges_from(edges)
-    st.session_state.original_graph = st.session_state.graph.copy()
+    remember_original(st.session_state.graph)
+    bump_graph_version()
 
 if 'highlighted_nodes' not in st.session_state:
     st.session_state.highlighted_nodes = set()
@@ -29,6 +49,32 @@ if 'hop_nodes' not in st.session_state:
 if 'remove_mode' not in st.session_state:
     st.session_state.remove_mode = None
 
+@st.cache_data(show_spinner=False)
+def graph_csr(nodes, edges):
+    """CSR adjacency (plus node -> row index) for the given node/edge tuples; cached per graph."""
+    idx = {n: i for i, n in enumerate(nodes)}
+    rows = np.fromiter((idx[u] for u, _ in edges), dtype=np.int32, count=len(edges))
+    cols = np.fromiter((idx[v] for _, v in edges), dtype=np.int32, count=len(edges))
+    A = csr_array((np.ones(len(edges), dtype=np.int8), (rows, cols)), shape=(len(nodes), len(nodes)))
+    return A, idx
+
+def khop_neighborhood(G, source, k):
+    """Nodes within k hops of source and the BFS-tree edges that reach them (run in SciPy)."""
+    nodes = tuple(G.nodes())
+    A, idx = graph_csr(nodes, tuple(G.edges()))
+    src = idx[source]
+    dist, pred = dijkstra(A, directed=False, unweighted=True, indices=src,
+                          limit=k, return_predecessors=True)
+    reached = np.flatnonzero(np.isfinite(dist))
+    reachable_nodes = {nodes[i] for i in reached}
+    reachable_edges = set()
+    for i in reached:
+        if i == src:
+            continue
+        u, v = nodes[pred[i]], nodes[i]
+        reachable_edges.add((min(u, v), max(u, v)))
+    return reachable_nodes, reachable_edges
+
 # Title
 st.title("🔗 Interactive Social Network Graph")
 
@@ -37,21 +83,27 @@ st.sidebar.header("Controls")
 
 # File upload
 uploaded_file = st.sidebar.file_uploader("Upload CSV (source,target)", type=['csv'])
-if uploaded_file is not None:
+# (only parse a newly uploaded file; reruns with the same upload keep the edited graph)
+if uploaded_file is not None and st.session_state.get('uploaded_file_id') != uploaded_file.file_id:
     try:
         df = pd.read_csv(uploaded_file)
         if len(df.columns) >= 2:
             edges = list(zip(df.iloc[:, 0], df.iloc[:, 1]))
             st.session_state.graph = nx.Graph()
             st.session_state.graph.add_edges_from(edges)
-            st.session_state.original_graph = st.session_state.graph.copy()
+            remember_original(st.session_state.graph)
+            bump_graph_version()
+            st.session_state.uploaded_file_id = uploaded_file.file_id
             st.sidebar.success("CSV loaded successfully!")
     except Exception as e:
         st.sidebar.error(f"Error loading CSV: {e}")
 
 # Reset button
 if st.sidebar.button("🔄 Reset Graph", use_container_width=True):
-    st.session_state.graph = st.session_state.original_graph.copy()
+    st.session_state.graph = nx.Graph()
+    st.session_state.graph.add_nodes_from(st.session_state.original_nodes)
+    st.session_state.graph.add_edges_from(st.session_state.original_edges)
+    bump_graph_version()
     st.session_state.highlighted_nodes = set()
     st.session_state.hop_nodes = set()
     st.session_state.hop_edges = set()
@@ -64,25 +116,34 @@ st.sidebar.divider()
 st.sidebar.subheader("Remove Elements")
 remove_node = st.sidebar.selectbox(
     "Select node to remove:",
-    ["None"] + sorted(list(st.session_state.graph.nodes())),
+    node_options(),
     key="remove_node_select"
 )
 if remove_node != "None" and st.sidebar.button("🗑️ Remove Node", use_container_width=True):
     if remove_node in st.session_state.graph.nodes():
         st.session_state.graph.remove_node(remove_node)
+        bump_graph_version()
         st.rerun()
 
-# Edge removal
-edges_list = ["None"] + [f"{u} - {v}" for u, v in st.session_state.graph.edges()]
-remove_edge = st.sidebar.selectbox(
-    "Select edge to remove:",
-    edges_list,
-    key="remove_edge_select"
+# Edge removal: pick one endpoint, then one of its neighbors (no per-edge label list)
+remove_edge_u = st.sidebar.selectbox(
+    "Select edge to remove (first node):",
+    node_options(),
+    key="remove_edge_u"
 )
-if remove_edge != "None" and st.sidebar.button("🗑️ Remove Edge", use_container_width=True):
-    u, v = remove_edge.split(" - ")
-    if st.session_state.graph.has_edge(u, v):
-        st.session_state.graph.remove_edge(u, v)
+if remove_edge_u != "None" and remove_edge_u in st.session_state.graph:
+    edge_v_options = ["None"] + sorted(st.session_state.graph.neighbors(remove_edge_u))
+else:
+    edge_v_options = ["None"]
+remove_edge_v = st.sidebar.selectbox(
+    "Select edge to remove (second node):",
+    edge_v_options,
+    key="remove_edge_v"
+)
+if remove_edge_v != "None" and st.sidebar.button("🗑️ Remove Edge", use_container_width=True):
+    if st.session_state.graph.has_edge(remove_edge_u, remove_edge_v):
+        st.session_state.graph.remove_edge(remove_edge_u, remove_edge_v)
+        bump_graph_version()
         st.rerun()
 
 st.sidebar.divider()
@@ -106,7 +167,7 @@ st.sidebar.divider()
 st.sidebar.subheader("📡 Show K-Hops")
 hop_source = st.sidebar.selectbox(
     "Source node:",
-    ["None"] + sorted(list(st.session_state.graph.nodes())),
+    node_options(),
     key="hop_source"
 )
 hop_distance = st.sidebar.number_input("Number of hops (k):", min_value=1, max_value=10, value=2)
@@ -114,20 +175,10 @@ hop_distance = st.sidebar.number_input("Number of hops (k):", min_value=1, max_v
 if st.sidebar.button("Show K-Hops", use_container_width=True):
     if hop_source != "None" and hop_source in st.session_state.graph.nodes():
         # BFS to find k-hop neighbors
-        reachable_nodes = {hop_source}
-        reachable_edges = set()
-        
-        current_level = [hop_source]
-        for _ in range(hop_distance):
-            next_level = []
-            for node in current_level:
-                for neighbor in st.session_state.graph.neighbors(node):
-                    if neighbor not in reachable_nodes:
-                        reachable_nodes.add(neighbor)
-                        next_level.append(neighbor)
-                        reachable_edges.add((min(node, neighbor), max(node, neighbor)))
-            current_level = next_level
-        
+        reachable_nodes, reachable_edges = khop_neighborhood(
+            st.session_state.graph, hop_source, hop_distance
+        )
+
         st.session_state.hop_nodes = reachable_nodes
         st.session_state.hop_edges = reachable_edges
         st.session_state.highlighted_nodes = set()
@@ -140,49 +191,69 @@ if st.sidebar.button("Clear All Highlights", use_container_width=True):
     st.session_state.hop_edges = set()
     st.rerun()
 
+LARGE_GRAPH_NODES = 500  # above this, use the energy (L-BFGS) layout solver
+MAX_NODE_LABELS = 200    # above this, only label marked and top-degree nodes
+
+@st.cache_data(show_spinner=False)
+def compute_layout(nodes, edges, seed=42):
+    """Spring layout for the given node/edge tuples; only recomputed when the graph changes."""
+    G = nx.Graph()
+    G.add_nodes_from(nodes)
+    G.add_edges_from(edges)
+    if len(G) >= LARGE_GRAPH_NODES:
+        try:
+            # NetworkX >= 3.4: energy minimisation with L-BFGS, converges in far fewer steps
+            return nx.spring_layout(G, k=2, iterations=50, seed=seed, method="energy")
+        except TypeError:
+            pass  # older NetworkX already switches to its sparse Fruchterman-Reingold here
+    return nx.spring_layout(G, k=2, iterations=50, seed=seed)
+
+def edge_segments(seg):
+    """Flatten (E, 2, 2) endpoint coordinates into x/y arrays of x0, x1, NaN triples."""
+    xy = np.full((len(seg), 3, 2), np.nan)
+    xy[:, :2] = seg
+    return xy[:, :, 0].ravel(), xy[:, :, 1].ravel()
+
 # Create graph visualization
 def create_network_graph(G):
-    # Use spring layout for better node distribution
-    pos = nx.spring_layout(G, k=2, iterations=50, seed=42)
+    # Use spring layout for better node distribution (cached across highlight/hop reruns)
+    pos = compute_layout(tuple(G.nodes()), tuple(G.edges()))
     
-    # Create edge traces
-    edge_trace = []
+    # Create edge traces: one line trace per style, segments separated by NaN gaps
+    edges = list(G.edges())
+    seg = np.array([(pos[u], pos[v]) for u, v in edges], dtype=float).reshape(-1, 2, 2)
+    
+    # Check which edges are in hop visualization
+    is_hop_edge = np.fromiter(
+        ((min(u, v), max(u, v)) in st.session_state.hop_edges for u, v in edges),
+        dtype=bool, count=len(edges)
+    )
     
-    for edge in G.edges():
-        x0, y0 = pos[edge[0]]
-        x1, y1 = pos[edge[1]]
-        
-        # Check if edge is in hop visualization
-        edge_tuple = (min(edge[0], edge[1]), max(edge[0], edge[1]))
-        is_hop_edge = edge_tuple in st.session_state.hop_edges
-        
+    edge_trace = []
+    for mask, width, color in [(~is_hop_edge, 3, '#475569'), (is_hop_edge, 5, '#10b981')]:
+        if not mask.any():
+            continue
+        edge_x, edge_y = edge_segments(seg[mask])
         edge_trace.append(
-            go.Scatter(
-                x=[x0, x1, None],
-                y=[y0, y1, None],
+            go.Scattergl(
+                x=edge_x,
+                y=edge_y,
                 mode='lines',
-                line=dict(
-                    width=5 if is_hop_edge else 3,
-                    color='#10b981' if is_hop_edge else '#475569'
-                ),
+                line=dict(width=width, color=color),
                 hoverinfo='none',
                 showlegend=False
             )
         )
     
     # Create node trace
-    node_x = []
-    node_y = []
-    node_text = []
+    node_text = list(G.nodes())
+    node_xy = np.array([pos[node] for node in node_text], dtype=float).reshape(-1, 2)
+    node_x = node_xy[:, 0]
+    node_y = node_xy[:, 1]
     node_colors = []
     node_sizes = []
     
-    for node in G.nodes():
-        x, y = pos[node]
-        node_x.append(x)
-        node_y.append(y)
-        node_text.append(node)
-        
+    for node in node_text:
         # Determine node color and size
         if node in st.session_state.hop_nodes:
             node_colors.append('#10b981')  # Green for hop nodes
@@ -194,25 +265,43 @@ def create_network_graph(G):
             node_colors.append('#3b82f6')  # Blue default
             node_sizes.append(20)
     
-    node_trace = go.Scatter(
+    node_trace = go.Scattergl(
         x=node_x,
         y=node_y,
-        mode='markers+text',
+        mode='markers',
         marker=dict(
             size=node_sizes,
             color=node_colors,
             line=dict(width=2, color='#1e40af')
         ),
-        text=node_text,
-        textposition="top center",
-        textfont=dict(size=12, color='#1e293b', family='Arial Black'),
         hoverinfo='text',
         hovertext=node_text,
         showlegend=False
     )
     
+    # Labels stay an SVG text layer (WebGL text is limited); on big graphs only
+    # highlighted/hop nodes and the highest-degree nodes are labelled
+    if len(node_text) <= MAX_NODE_LABELS:
+        label_idx = np.arange(len(node_text))
+    else:
+        marked = st.session_state.hop_nodes | st.session_state.highlighted_nodes
+        degrees = np.fromiter((d for _, d in G.degree(node_text)), dtype=np.int64, count=len(node_text))
+        is_marked = np.fromiter((n in marked for n in node_text), dtype=bool, count=len(node_text))
+        label_idx = np.union1d(np.argsort(-degrees, kind='stable')[:MAX_NODE_LABELS], np.flatnonzero(is_marked))
+    
+    label_trace = go.Scatter(
+        x=node_x[label_idx],
+        y=node_y[label_idx],
+        mode='text',
+        text=[node_text[i] for i in label_idx],
+        textposition="top center",
+        textfont=dict(size=12, color='#1e293b', family='Arial Black'),
+        hoverinfo='skip',
+        showlegend=False
+    )
+    
     # Create figure
-    fig = go.Figure(data=edge_trace + [node_trace])
+    fig = go.Figure(data=edge_trace + [node_trace, label_trace])
     
     fig.update_layout(
         showlegend=False,
@@ -250,7 +339,7 @@ with st.expander("📖 Instructions"):
     **How to use this application:**
     
     1. **Upload CSV**: Upload a CSV file with two columns (source, target) to create your own network
-    2. **Remove Elements**: Select nodes or edges from the dropdown menus and click remove
+    2. **Remove Elements**: Select a node, or an edge by picking both of its endpoints, and click remove
     3. **Highlight Nodes**: Enter comma-separated node names to highlight and enlarge them (orange)
     4. **Show K-Hops**: Select a source node and number of hops to visualize information spread (green)
     5. **Reset Graph**: Click the reset button to restore the original graph
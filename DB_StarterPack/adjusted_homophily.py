@@ -1,6 +1,16 @@
 # adjusted_homophily.py
 # Computes global adjusted homophily safely for large graphs.
 
+import itertools
+
+import numpy as np
+
+try:
+    from scipy import sparse
+except ImportError:   # NumPy-only fallback (np.bincount) below
+    sparse = None
+
+
 def adjusted_homophily(G, labels):
     """
     Computes adjusted homophily (assortativity-style) for a graph.
@@ -16,43 +26,66 @@ def adjusted_homophily(G, labels):
     -------
     float : adjusted homophily value in [-1, 1]
     """
-    # Defensive: ensure missing labels don't crash
-    L = {n: labels.get(n, None) for n in G.nodes()}
-
-    # Count edges where both endpoints share the same label
-    total_edges = 0
-    same_label_edges = 0
-
-    for u, v in G.edges():
-        total_edges += 1
-        if L[u] is not None and L[u] == L[v]:
-            same_label_edges += 1
-
+    nodes = list(G.nodes())
+    node_idx = {n: i for i, n in enumerate(nodes)}
+
+    # Encode labels as dense ints; -1 marks a missing label (never matches)
+    label_codes = {}
+    lab_arr = np.fromiter(
+        (label_codes.setdefault(labels[n], len(label_codes)) if labels.get(n) is not None else -1
+         for n in nodes),
+        dtype=np.int64, count=len(nodes)
+    )
+
+    # Edge endpoints as an (E, 2) index array — one pass, then everything stays in NumPy/SciPy
+    edges = np.fromiter(
+        itertools.chain.from_iterable((node_idx[u], node_idx[v]) for u, v in G.edges()),
+        dtype=np.int64
+    ).reshape(-1, 2)
+
+    total_edges = edges.shape[0]
     if total_edges == 0:
         return 0.0
 
-    h_edge = same_label_edges / total_edges
-
-    # Degree-based expected probability
-    degrees = dict(G.degree())
-    total_deg = sum(degrees.values())
-
-    if total_deg == 0:
-        return 0.0
+    # Degree-based expected probability (each edge adds 1 to both endpoints, like G.degree())
+    total_deg = 2 * total_edges
+
+    if sparse is not None:
+        # Sparse edge matrix A (A[u, v] = edges u->v) and one-hot label matrix Y (N x C);
+        # unlabelled nodes get an all-zero row so they never count as a match
+        n, c = len(nodes), len(label_codes)
+        A = sparse.csr_array(
+            (np.ones(total_edges), (edges[:, 0], edges[:, 1])), shape=(n, n)
+        )
+        labelled = np.flatnonzero(lab_arr >= 0)
+        Y = sparse.csr_array(
+            (np.ones(labelled.size), (labelled, lab_arr[labelled])), shape=(n, c)
+        )
+        AY = A @ Y      # AY[u, l] = edges from u into label l
+        AtY = A.T @ Y   # AtY[v, l] = edges into v from label l
+
+        # Count edges where both endpoints share the same label
+        same_label_edges = float(Y.multiply(AY).sum())
+
+        # Sum of degrees for each label: endpoints of every edge, bucketed by label
+        label_deg = np.asarray(AY.sum(axis=0) + AtY.sum(axis=0)).ravel()
+    else:
+        # Count edges where both endpoints share the same label
+        lu, lv = lab_arr[edges[:, 0]], lab_arr[edges[:, 1]]
+        same_label_edges = int(((lu == lv) & (lu >= 0)).sum())
+
+        # Sum of degrees for each label, accumulated with bincount instead of a dict loop
+        degrees = np.bincount(edges.ravel(), minlength=len(nodes))
+        labelled = lab_arr >= 0
+        label_deg = np.bincount(lab_arr[labelled], weights=degrees[labelled])
 
-    # Sum of degrees for each label
-    label_deg = {}
-    for n, deg in degrees.items():
-        lab = L[n]
-        if lab is None:
-            continue
-        label_deg[lab] = label_deg.get(lab, 0) + deg
+    h_edge = same_label_edges / total_edges
 
     # Degree proportions
-    p_bar = {lab: d / total_deg for lab, d in label_deg.items()}
+    p_bar = label_deg / total_deg
 
     # Sum of squared degree proportions
-    sum_pb2 = sum(p * p for p in p_bar.values())
+    sum_pb2 = float((p_bar * p_bar).sum())
 
     # If denominator is zero, avoid crash
     if (1 - sum_pb2) == 0:
@@ -67,4 +100,3 @@ def adjusted_homophily(G, labels):
 # Example run (only works if G and labels already exist in the script using this module)
 # adj_homophily = adjusted_homophily(G, labels)
 # print(f"Adjusted Homophily: {adj_homophily:.3f}")
-
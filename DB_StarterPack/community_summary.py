@@ -1,24 +1,36 @@
+import argparse
 import pandas as pd
 import networkx as nx
-import community as community_louvain     # python-louvain
+
+from louvain_backends import community_partition
 
 EDGES = r"C:\Users\p2123\Desktop\COLLEGE\PROJECT_3rdYear\Social_Network_Project\data\edges.csv"
 LEADERS = "per_community_leaders.csv"
 
 
 def load_graph():
-    df = pd.read_csv(EDGES)
-    if {"source", "target"}.issubset(df.columns):
-        edges = df[["source", "target"]].values.tolist()
+    # Peek at the header so only the two endpoint columns are parsed
+    cols = pd.read_csv(EDGES, nrows=0).columns
+    if {"source", "target"}.issubset(cols):
+        sc, tc = "source", "target"
     else:
-        edges = df.iloc[:, :2].values.tolist()
+        sc, tc = cols[0], cols[1]
+
+    try:
+        df = pd.read_csv(EDGES, usecols=[sc, tc], dtype={sc: "int64", tc: "int64"})
+    except ValueError:
+        # non-integer ids: let pandas infer the dtype
+        df = pd.read_csv(EDGES, usecols=[sc, tc])
 
-    G = nx.Graph()
-    G.add_edges_from(edges)
+    G = nx.from_pandas_edgelist(df, sc, tc, create_using=nx.Graph())
     return G
 
 
 def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--gpu", action="store_true", help="Run Louvain on the GPU via cugraph (if installed)")
+    args = p.parse_args()
+
     print("\n=== Community Summary Report ===\n")
 
     # Load graph
@@ -26,14 +38,13 @@ def main():
     print(f"Graph loaded: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges\n")
 
     # Louvain detection
-    partition = community_louvain.best_partition(G)
+    partition, modularity, _ = community_partition(G, use_gpu=args.gpu)
 
     # 1️⃣ Number of communities
     communities = set(partition.values())
     print(f"Number of communities: {len(communities)}")
 
     # 2️⃣ Modularity score
-    modularity = community_louvain.modularity(partition, G)
     print(f"Modularity score: {modularity:.4f}")
 
     # 3️⃣ Community size distribution
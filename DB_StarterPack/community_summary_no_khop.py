@@ -11,15 +11,32 @@ Produces:
      - leader_reach_k2_pct (percentage of community reachable within 2 hops)
  - Console summary (largest/smallest/average sizes + leaders snippet)
 
+Pass --gpu to run Louvain on the GPU with cugraph when it is installed; on CPU,
+igraph's Louvain is preferred over python-louvain when igraph is installed.
+
 No visualization included.
 """
+import argparse
 import math
+import numpy as np
 import pandas as pd
 import networkx as nx
-from collections import defaultdict
-import community as community_louvain   # python-louvain
 import os
 
+try:
+    from numba import njit, prange   # optional: JIT-compiled leader selection + k-hop BFS
+except ImportError:
+    njit = None
+    prange = range
+
+try:
+    from joblib import Parallel, delayed   # optional: spreads the pure-Python fallback over cores
+except ImportError:
+    Parallel = None
+
+from louvain_backends import community_partition
+from node_ids import edge_id_columns
+
 # ---------------- CONFIG: update if your files are elsewhere ----------------
 EDGES_PATH = r'C:\Users\p2123\Desktop\COLLEGE\PROJECT_3rdYear\Social_Network_Project\data\edges.csv'
 INFLUENCE_PATH = r'C:\Users\p2123\Desktop\COLLEGE\PROJECT_3rdYear\Social_Network_Project\data\influence_scores_formula.csv'
@@ -45,20 +62,10 @@ def load_graph_from_edges(path):
     else:
         sc, tc = df.columns[0], df.columns[1]
 
-    edges = []
-    for _, r in df.iterrows():
-        u = r[sc]; v = r[tc]
-        # normalize ids to strings (attempt integer conversion first)
-        try:
-            u = str(int(u))
-            v = str(int(v))
-        except Exception:
-            u = str(u)
-            v = str(v)
-        edges.append((u, v))
-
+    # normalize ids to strings (integer form where numeric), once per distinct id
+    u, v = edge_id_columns(df[sc], df[tc])
     G = nx.Graph()
-    G.add_edges_from(edges)
+    G.add_edges_from(zip(u.tolist(), v.tolist()))
     return G
 
 def read_influence_map(path):
@@ -116,8 +123,165 @@ def compute_khop_reach_within(G, members, leader, k=2):
     return len(lengths)
 
 
+def select_leader_python(members, score_map, degree):
+    """Pure-Python leader pick for one community: (leader_node, leader_score).
+    degree maps node -> degree in the full graph (used only for the fallback)."""
+    best_node = None
+    best_score = float('-inf')
+    # choose the highest valid numeric score (skip NaN)
+    for m in members:
+        s = score_map.get(str(m), None)
+        if s is None or (isinstance(s, float) and (math.isnan(s))):
+            continue
+        try:
+            sf = float(s)
+        except:
+            continue
+        if sf > best_score:
+            best_score = sf
+            best_node = str(m)
+    # If no member had a valid score, fall back to highest degree within community
+    if best_node is None:
+        # fallback winner by degree (prefer nodes present in G)
+        try:
+            best_node = max(members, key=lambda n: degree[n] if n in degree else -1)
+            best_score = score_map.get(best_node, float('nan'))
+        except Exception:
+            best_node = members[0]
+            best_score = score_map.get(best_node, float('nan'))
+    return best_node, best_score
+
+
+def community_payload(G, members, score_map):
+    """Just the data one community needs (own edges, degrees, scores) so it pickles cheaply."""
+    edges = list(G.subgraph(members).edges())
+    degree = {m: G.degree(m) for m in members if m in G}
+    scores = {m: score_map[m] for m in members if m in score_map}
+    return members, edges, degree, scores
+
+
+def leader_and_reach_python(members, edges, degree, scores, k=2):
+    """Leader (see select_leader_python) and its k-hop reach inside one community."""
+    G_sub = nx.Graph()
+    G_sub.add_nodes_from(members)
+    G_sub.add_edges_from(edges)
+    best_node, best_score = select_leader_python(members, scores, degree)
+    reach = compute_khop_reach_within(G_sub, members, best_node, k=k)
+    return best_node, best_score, reach
+
+
+def group_by_community(nodes, partition):
+    """
+    Partition as flat int arrays instead of per-community lists of node ids.
+    Communities are re-coded to 0..C-1 (comm_of[i] for nodes[i]); comm_ids[c] is the
+    original id, and the members of c are nodes[members_flat[members_ptr[c]:members_ptr[c+1]]]
+    (in graph order).
+    """
+    comm_ids, comm_of = np.unique(
+        np.fromiter((partition[n] for n in nodes), dtype=np.int64, count=len(nodes)),
+        return_inverse=True
+    )
+    comm_of = comm_of.astype(np.int32)
+    members_flat = np.argsort(comm_of, kind='stable').astype(np.int32)
+    members_ptr = np.zeros(len(comm_ids) + 1, dtype=np.int64)
+    members_ptr[1:] = np.cumsum(np.bincount(comm_of, minlength=len(comm_ids)))
+    return comm_ids, comm_of, members_flat, members_ptr
+
+
+def build_csr(G, nodes):
+    """CSR adjacency (indptr, indices) of G as int32 arrays, rows in `nodes` order."""
+    A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=None, format='csr')
+    return A.indptr.astype(np.int32), A.indices.astype(np.int32)
+
+
+def _khop_count_within_csr(indptr, indices, comm_of, src, k, mark, stamp, queue, depth):
+    """
+    Count nodes within k hops of src (including src) without leaving src's community.
+    mark/queue/depth are preallocated work arrays; mark[v] == stamp means visited in
+    this call, so the arrays never need clearing between calls. Only nodes of src's
+    community are ever read or written in mark, so communities can share it.
+    """
+    c = comm_of[src]
+    mark[src] = stamp
+    queue[0] = src
+    depth[0] = 0
+    head = 0
+    tail = 1
+    while head < tail:
+        u = queue[head]
+        d = depth[head]
+        head += 1
+        if d >= k:
+            continue
+        for p in range(indptr[u], indptr[u + 1]):
+            v = indices[p]
+            if comm_of[v] == c and mark[v] != stamp:
+                mark[v] = stamp
+                queue[tail] = v
+                depth[tail] = d + 1
+                tail += 1
+    return tail
+
+
+def _leaders_and_reach_csr(indptr, indices, comm_of, members_ptr, members_flat, infl, deg, k):
+    """
+    For every community c (members_flat[members_ptr[c]:members_ptr[c+1]]): leader = member
+    with the highest non-NaN influence (first wins ties), else the highest-degree member;
+    then the leader's k-hop reach inside the community. Communities run in parallel.
+    """
+    n_nodes = comm_of.shape[0]
+    n_comms = members_ptr.shape[0] - 1
+    leaders = np.empty(n_comms, dtype=np.int32)
+    reach = np.empty(n_comms, dtype=np.int32)
+    mark = np.zeros(n_nodes, dtype=np.int32)
+    queue = np.empty(n_nodes, dtype=np.int32)
+    depth = np.empty(n_nodes, dtype=np.int32)
+    for c in prange(n_comms):
+        lo = members_ptr[c]
+        hi = members_ptr[c + 1]
+        best = -1
+        best_score = -np.inf
+        for p in range(lo, hi):
+            s = infl[members_flat[p]]
+            if s > best_score:   # NaN compares False, so missing scores are skipped
+                best_score = s
+                best = members_flat[p]
+        if best == -1:
+            best_deg = -1
+            for p in range(lo, hi):
+                v = members_flat[p]
+                if deg[v] > best_deg:
+                    best_deg = deg[v]
+                    best = v
+        leaders[c] = best
+        # BFS stays inside the community, so its slice of queue/depth is always big enough
+        reach[c] = _khop_count_within_csr(indptr, indices, comm_of, best, k, mark, c + 1,
+                                          queue[lo:hi], depth[lo:hi])
+    return leaders, reach
+
+
+if njit is not None:
+    _khop_count_within_csr = njit(cache=True, nogil=True)(_khop_count_within_csr)
+    _leaders_and_reach_csr = njit(cache=True, parallel=True)(_leaders_and_reach_csr)
+
+
+def select_leaders_csr(G, nodes, comm_of, members_flat, members_ptr, score_map, k=2):
+    """
+    Leader + k-hop reach for every community in one compiled pass.
+    Returns (leaders, reach) arrays indexed by community code; leaders are indices into nodes.
+    """
+    indptr, indices = build_csr(G, nodes)
+    infl = np.array([score_map.get(n, np.nan) for n in nodes], dtype=np.float64)
+    deg = np.fromiter((d for _, d in G.degree(nodes)), dtype=np.int64, count=len(nodes))
+    return _leaders_and_reach_csr(indptr, indices, comm_of, members_ptr, members_flat, infl, deg, k)
+
+
 # ---------------- main ----------------
 def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--gpu", action="store_true", help="Run Louvain on the GPU via cugraph (if installed)")
+    args = p.parse_args()
+
     print("Loading graph from:", EDGES_PATH)
     G = load_graph_from_edges(EDGES_PATH)
     print("Graph loaded: nodes =", G.number_of_nodes(), "edges =", G.number_of_edges())
@@ -127,23 +291,23 @@ def main():
     print("Using influence column:", score_col)
 
     print("Running Louvain community detection (full graph)...")
-    partition = community_louvain.best_partition(G)
+    partition, modularity, _ = community_partition(G, use_gpu=args.gpu)
     num_comms = len(set(partition.values()))
     print("Number of communities detected:", num_comms)
 
-    modularity = community_louvain.modularity(partition, G)
     print("Modularity score:", modularity)
 
-    # build community -> members mapping (as string ids)
-    comm_map = defaultdict(list)
-    for node, comm in partition.items():
-        comm_map[comm].append(str(node))
+    # community structure as flat int arrays (no per-community lists of id strings)
+    nodes = list(G.nodes())
+    comm_ids, comm_of, members_flat, members_ptr = group_by_community(nodes, partition)
+    comm_size_arr = np.diff(members_ptr)
+
+    def members_of(c):
+        return [nodes[i] for i in members_flat[members_ptr[c]:members_ptr[c + 1]]]
 
     # community size distribution DF
-    comm_rows = []
-    for comm, members in comm_map.items():
-        comm_rows.append({'community': comm, 'size': len(members)})
-    comm_sizes_df = pd.DataFrame(comm_rows).sort_values('size', ascending=False).reset_index(drop=True)
+    comm_sizes_df = pd.DataFrame({'community': comm_ids, 'size': comm_size_arr})
+    comm_sizes_df = comm_sizes_df.sort_values('size', ascending=False).reset_index(drop=True)
     comm_sizes_df.to_csv(OUT_COMM_SIZES, index=False)
     print("Saved community size distribution to:", OUT_COMM_SIZES)
 
@@ -153,39 +317,29 @@ def main():
     smallest = int(sizes.min())
     average = float(sizes.mean())
 
-    # select leader (max influence) for each community and compute k-hop reach + pct
-    leaders_rows = []
-    for comm, members in sorted(comm_map.items(), key=lambda x: x[0]):  # sort by community id for stability
-        best_node = None
-        best_score = float('-inf')
-        # choose the highest valid numeric score (skip NaN)
-        for m in members:
-            s = score_map.get(str(m), None)
-            if s is None or (isinstance(s, float) and (math.isnan(s))):
-                continue
-            try:
-                sf = float(s)
-            except:
-                continue
-            if sf > best_score:
-                best_score = sf
-                best_node = str(m)
-        # If no member had a valid score, fall back to highest degree within community
-        if best_node is None:
-            # fallback winner by degree (prefer nodes present in G)
-            try:
-                best_node = max(members, key=lambda n: G.degree(n) if n in G else -1)
-                best_score = score_map.get(best_node, float('nan'))
-            except Exception:
-                best_node = members[0]
-                best_score = score_map.get(best_node, float('nan'))
-
-        # Compute leader reach within community using k = 2
-        reach_k2 = compute_khop_reach_within(G, members, best_node, k=2)
+    # select leader (max influence) for each community and compute k-hop reach
+    # (communities in sorted id order for stability; results[c] is for comm_ids[c])
+    if njit is not None:
+        # numba: one compiled pass, parallel over communities
+        leaders, reach = select_leaders_csr(G, nodes, comm_of, members_flat, members_ptr, score_map, k=2)
+        results = [(nodes[leaders[c]], score_map.get(nodes[leaders[c]], float('nan')), int(reach[c]))
+                   for c in range(len(comm_ids))]
+    elif Parallel is not None:
+        # joblib: communities are independent, each job only gets its own payload
+        results = Parallel(n_jobs=-1)(
+            delayed(leader_and_reach_python)(*community_payload(G, members_of(c), score_map), k=2)
+            for c in range(len(comm_ids))
+        )
+    else:
+        results = [leader_and_reach_python(*community_payload(G, members_of(c), score_map), k=2)
+                   for c in range(len(comm_ids))]
 
+    leaders_rows = []
+    for c, comm in enumerate(comm_ids.tolist()):
+        best_node, best_score, reach_k2 = results[c]
 
         # Compute percentage (defensive against division by zero)
-        comm_size = len(members)
+        comm_size = int(comm_size_arr[c])
         if comm_size > 0:
             reach_pct = round((reach_k2 / comm_size) * 100.0, 2)
         else:
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""
+csv_engine.py
+
+CSV_ENGINE is the pandas.read_csv engine for the scripts: "pyarrow" (a
+multi-threaded reader) when pyarrow is installed, else pandas' C parser.
+"""
+
+try:
+    import pyarrow  # noqa: F401  (optional: lets pandas use its multi-threaded CSV reader)
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
@@ -1,22 +1,33 @@
 # export_edges_for_networkx.py
 # Usage:
-#   pip install pymongo
+#   pip install pymongo pandas
+#   pip install pyarrow            # optional: also writes edges.parquet
 #   python export_edges_for_networkx.py
-# Writes edges.csv and users.csv to the ../data/ directory.
+# Writes edges.csv (+ edges.parquet) and users.csv to the ../data/ directory.
 # Minimal, robust, streaming version (keeps same columns as original).
 
 import os
 import csv
+import pandas as pd
 from pymongo import MongoClient
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
 MONGO_URI = "mongodb://127.0.0.1:27017"  # MongoDB local host
 DB_NAME = "minor_proj"
 OUT_DIR = os.path.join("..", "data")
 EDGE_OUT = os.path.join(OUT_DIR, "edges.csv")
+EDGE_PARQUET_OUT = os.path.join(OUT_DIR, "edges.parquet")
 USER_OUT = os.path.join(OUT_DIR, "users.csv")
 
 # Tuneable
-CURSOR_BATCH_SIZE = 5000
+CURSOR_BATCH_SIZE = 50000      # docs per getMore round trip (server still caps a batch at 16 MB)
+WRITE_BATCH_ROWS = 50000       # rows handed to the CSV writer per call
+WRITE_BUFFER_BYTES = 1 << 20   # 1 MiB file buffer -> far fewer write() syscalls
 EDGE_PROGRESS_EVERY = 50000
 USER_PROGRESS_EVERY = 5000
 
@@ -29,29 +40,59 @@ db = client[DB_NAME]
 # Export edges (streamed)
 # ----------------------------
 print("Exporting edges to:", EDGE_OUT)
-edge_projection = {"src": 1, "dst": 1, "type": 1, "weight": 1}
-cursor = db.edges.find({}, edge_projection).batch_size(CURSOR_BATCH_SIZE)
+# _id is excluded so the server never sends (and pymongo never decodes) an ObjectId per edge
+edge_projection = {"_id": 0, "src": 1, "dst": 1, "type": 1, "weight": 1}
+cursor = db.edges.find({}, edge_projection, batch_size=CURSOR_BATCH_SIZE)
+
+EDGE_COLUMNS = ["src", "dst", "type", "weight"]
+if pa is not None:
+    EDGE_SCHEMA = pa.schema([("src", pa.string()), ("dst", pa.string()),
+                             ("type", pa.string()), ("weight", pa.float64())])
+
+
+def write_edge_batch(f, batch, parquet_writer=None):
+    """Write one batch of (src, dst, type, weight) rows; weight coercion is vectorized."""
+    df = pd.DataFrame(batch, columns=EDGE_COLUMNS)
+    # unparsable / missing weights fall back to 1.0, same as the old per-row float()
+    df["weight"] = pd.to_numeric(df["weight"], errors="coerce").fillna(1.0).astype("float64")
+    df.to_csv(f, header=False, index=False, lineterminator="\r\n")  # match csv.writer
+    if parquet_writer is not None:
+        df["type"] = df["type"].astype("string")
+        parquet_writer.write_table(pa.Table.from_pandas(df, schema=EDGE_SCHEMA, preserve_index=False))
+
 
 written_edges = 0
-with open(EDGE_OUT, "w", newline="", encoding="utf-8") as f:
-    w = csv.writer(f)
-    w.writerow(["src", "dst", "type", "weight"])
-    for doc in cursor:
-        src = doc.get("src")
-        dst = doc.get("dst")
-        if src is None or dst is None:
-            continue
-        etype = doc.get("type", "friend")
-        try:
-            weight = float(doc.get("weight", 1.0))
-        except Exception:
-            weight = 1.0
-        w.writerow([str(src), str(dst), etype, weight])
-        written_edges += 1
-        if written_edges % EDGE_PROGRESS_EVERY == 0:
-            f.flush()
-            print(f"  edges written: {written_edges}")
-    f.flush()
+next_report = EDGE_PROGRESS_EVERY
+parquet_writer = None
+if pa is not None:
+    print("Also writing typed edges to:", EDGE_PARQUET_OUT)
+    parquet_writer = pq.ParquetWriter(EDGE_PARQUET_OUT, EDGE_SCHEMA, compression="snappy")
+# the writer is closed even if the export fails, so edges.parquet always gets its footer
+try:
+    with open(EDGE_OUT, "w", newline="", encoding="utf-8", buffering=WRITE_BUFFER_BYTES) as f:
+        csv.writer(f).writerow(EDGE_COLUMNS)
+        batch = []
+        for doc in cursor:
+            src = doc.get("src")
+            dst = doc.get("dst")
+            if src is None or dst is None:
+                continue
+            batch.append((str(src), str(dst), doc.get("type", "friend"), doc.get("weight", 1.0)))
+            if len(batch) >= WRITE_BATCH_ROWS:
+                write_edge_batch(f, batch, parquet_writer)
+                written_edges += len(batch)
+                batch = []
+                if written_edges >= next_report:
+                    f.flush()
+                    print(f"  edges written: {written_edges}")
+                    next_report += EDGE_PROGRESS_EVERY
+        if batch:
+            write_edge_batch(f, batch, parquet_writer)
+            written_edges += len(batch)
+        f.flush()
+finally:
+    if parquet_writer is not None:
+        parquet_writer.close()
 
 print("Finished exporting edges. total written:", written_edges)
 
@@ -59,73 +100,96 @@ print("Finished exporting edges. total written:", written_edges)
 # Export users (streamed)
 # ----------------------------
 print("Exporting users to:", USER_OUT)
-user_cursor = db.users.find({}).batch_size(CURSOR_BATCH_SIZE)
+# only the location sub-fields that end up in the CSV are sent over the wire
+user_projection = {
+    "_id": 1, "name": 1, "age": 1, "gender": 1,
+    "location.city": 1, "location.state": 1, "location.country": 1, "primaryLang": 1,
+    "languages": 1, "joinedAt": 1, "education": 1, "profession": 1, "interests": 1,
+    "purpose": 1, "thirdParty": 1, "community": 1
+}
+user_cursor = db.users.find({}, user_projection, batch_size=CURSOR_BATCH_SIZE)
+
+USER_COLUMNS = [
+    "_id",
+    "name",
+    "age",
+    "gender",
+    "city",
+    "state",
+    "country",
+    "primaryLang",
+    "languages",        # comma-separated codes
+    "joinedAt",
+    "education",
+    "profession",
+    "interests",        # comma-separated interests
+    "purpose",
+    "thirdParty",
+    "community"
+]
+
+
+def user_row(u):
+    loc = u.get("location", {}) or {}
+    # handle languages stored as list of dicts or list of codes
+    langs = u.get("languages", [])
+    if isinstance(langs, list):
+        lang_codes = []
+        for item in langs:
+            if isinstance(item, dict):
+                code = item.get("code", "")
+                if code: lang_codes.append(code)
+            elif isinstance(item, str):
+                lang_codes.append(item)
+        langs_str = ",".join(lang_codes)
+    else:
+        langs_str = str(langs)
+
+    interests = u.get("interests", [])
+    if isinstance(interests, list):
+        interests_str = ",".join([str(x) for x in interests])
+    else:
+        interests_str = str(interests)
+
+    return [
+        str(u.get("_id", "")),
+        u.get("name", ""),
+        u.get("age", ""),
+        u.get("gender", ""),
+        loc.get("city", ""),
+        loc.get("state", ""),
+        loc.get("country", ""),
+        u.get("primaryLang", ""),
+        langs_str,
+        u.get("joinedAt", ""),
+        u.get("education", ""),
+        u.get("profession", ""),
+        interests_str,
+        u.get("purpose", ""),
+        u.get("thirdParty", False),
+        u.get("community", "")
+    ]
+
 
 written_users = 0
-with open(USER_OUT, "w", newline="", encoding="utf-8") as f:
+next_report = USER_PROGRESS_EVERY
+with open(USER_OUT, "w", newline="", encoding="utf-8", buffering=WRITE_BUFFER_BYTES) as f:
     w = csv.writer(f)
-    w.writerow([
-        "_id",
-        "name",
-        "age",
-        "gender",
-        "city",
-        "state",
-        "country",
-        "primaryLang",
-        "languages",        # comma-separated codes
-        "joinedAt",
-        "education",
-        "profession",
-        "interests",        # comma-separated interests
-        "purpose",
-        "thirdParty",
-        "community"
-    ])
+    w.writerow(USER_COLUMNS)
+    rows = []
     for u in user_cursor:
-        loc = u.get("location", {}) or {}
-        # handle languages stored as list of dicts or list of codes
-        langs = u.get("languages", [])
-        if isinstance(langs, list):
-            lang_codes = []
-            for item in langs:
-                if isinstance(item, dict):
-                    code = item.get("code", "")
-                    if code: lang_codes.append(code)
-                elif isinstance(item, str):
-                    lang_codes.append(item)
-            langs_str = ",".join(lang_codes)
-        else:
-            langs_str = str(langs)
-
-        interests = u.get("interests", [])
-        if isinstance(interests, list):
-            interests_str = ",".join([str(x) for x in interests])
-        else:
-            interests_str = str(interests)
-
-        w.writerow([
-            str(u.get("_id", "")),
-            u.get("name", ""),
-            u.get("age", ""),
-            u.get("gender", ""),
-            loc.get("city", ""),
-            loc.get("state", ""),
-            loc.get("country", ""),
-            u.get("primaryLang", ""),
-            langs_str,
-            u.get("joinedAt", ""),
-            u.get("education", ""),
-            u.get("profession", ""),
-            interests_str,
-            u.get("purpose", ""),
-            u.get("thirdParty", False),
-            u.get("community", "")
-        ])
-        written_users += 1
-        if written_users % USER_PROGRESS_EVERY == 0:
-            f.flush()
-            print(f"  users written: {written_users}")
+        rows.append(user_row(u))
+        if len(rows) >= WRITE_BATCH_ROWS:
+            w.writerows(rows)
+            written_users += len(rows)
+            rows.clear()
+            if written_users >= next_report:
+                f.flush()
+                print(f"  users written: {written_users}")
+                next_report = (written_users // USER_PROGRESS_EVERY + 1) * USER_PROGRESS_EVERY
+    if rows:
+        w.writerows(rows)
+        written_users += len(rows)
     f.flush()
 
 print("Finished exporting users. total written:", written_users)
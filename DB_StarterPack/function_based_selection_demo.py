@@ -1,57 +1,84 @@
 import pandas as pd
 import networkx as nx
-import ast
+import numpy as np
 
-# ----------------------------
-# Utility: Parse field
-# ----------------------------
-def parse_list_field(field_value):
-    try:
-        if pd.isna(field_value) or field_value == "":
-            return []
-        if isinstance(field_value, list):
-            return field_value
-        return ast.literal_eval(field_value)
-    except:
-        return []
+from csv_engine import CSV_ENGINE
+from list_fields import LIST_SET_COLUMNS, add_list_field_sets, list_field_sets
+from louvain_backends import community_partition
+from pagerank_csr import pagerank
 
 # ----------------------------
 # Subgraph Selection
 # ----------------------------
 def multi_attribute_subgraph(G, users, **kwargs):
-    selected_ids = set(users["_id"])
+    mask = np.ones(len(users), dtype=bool)
     for attr, val in kwargs.items():
         if val is not None:
-            if attr in ["languages", "interests"]:
-                matched = users[users[attr].apply(
-                    lambda x: bool(set(val) & set(parse_list_field(x)))
-                )]["_id"]
+            if attr in LIST_SET_COLUMNS:
+                col = LIST_SET_COLUMNS[attr]
+                sets = users[col] if col in users else list_field_sets(users[attr], attr)
+                val_set = set(val)
+                mask &= ~sets.map(val_set.isdisjoint).to_numpy(dtype=bool)
             elif isinstance(val, (list, set, range)):
-                matched = users[users[attr].isin(val)]["_id"]
+                mask &= users[attr].isin(val).to_numpy()
             else:
-                matched = users[users[attr] == val]["_id"]
-            selected_ids &= set(matched)
-    return G.subgraph(selected_ids).copy(), users[users["_id"].isin(selected_ids)]
+                mask &= (users[attr] == val).to_numpy()
+    selected_ids = users["_id"].to_numpy()[mask]
+    sub_users = users[users["_id"].isin(selected_ids)]
+    return G.subgraph(set(selected_ids.tolist())).copy(), sub_users
 
 # ----------------------------
 # PageRank
 # ----------------------------
+def block_pagerank(G, alpha=0.85, tol=1e-6, max_iter=100, weight="weight", small=32):
+    """
+    PageRank of an undirected graph, one connected component at a time.
+
+    With no dangling nodes, no rank flows between components, so a node's global
+    score is its in-component score times |C| / |V|. Each large component then
+    stops iterating as soon as it has converged on its own; components smaller
+    than `small` are batched into a single run. Directed graphs, and graphs with
+    dangling (zero-weight) nodes, whose rank is spread globally, use one run.
+    """
+    n = G.number_of_nodes()
+    if n == 0 or G.is_directed() or any(d == 0 for _, d in G.degree(weight=weight)):
+        return pagerank(G, alpha=alpha, tol=tol, max_iter=max_iter, weight=weight)
+    comps = list(nx.connected_components(G))
+    if len(comps) == 1:
+        return pagerank(G, alpha=alpha, tol=tol, max_iter=max_iter, weight=weight)
+    pr = {}
+    small_nodes = []
+    for comp in comps:
+        if len(comp) < small:
+            small_nodes.extend(comp)
+            continue
+        sub = pagerank(G.subgraph(comp), alpha=alpha, tol=tol, max_iter=max_iter, weight=weight)
+        pr.update({v: r * len(comp) / n for v, r in sub.items()})
+    if small_nodes:
+        sub = pagerank(G.subgraph(small_nodes), alpha=alpha, tol=tol, max_iter=max_iter, weight=weight)
+        pr.update({v: r * len(small_nodes) / n for v, r in sub.items()})
+    return {v: pr[v] for v in G}   # same key order as a single run
+
+
+def names_by_id(users):
+    """_id -> name for the first row of each id (what a users["_id"] == uid lookup returned)."""
+    first = users.drop_duplicates("_id")
+    return dict(zip(first["_id"], first["name"]))
+
+
 def pagerank_with_names(G, users, top_k=10, csv_out=None):
-    pr = nx.pagerank(G, weight="weight")
+    pr = block_pagerank(G, weight="weight")
     pr_top = sorted(pr.items(), key=lambda x: x[1], reverse=True)[:top_k]
+    name_by_id = names_by_id(users)
     print("\nTop PageRank nodes:")
     for node, score in pr_top:
-        name_row = users.loc[users["_id"] == node, "name"]
-        name = name_row.iloc[0] if not name_row.empty else "Unknown"
-        print(f"{node} ({name}) -> {score:.5f}")
+        print(f"{node} ({name_by_id.get(node, 'Unknown')}) -> {score:.5f}")
     if csv_out:
-        pr_df = pd.DataFrame(
-            [(uid,
-              users.loc[users["_id"] == uid, "name"].iloc[0] if not users.loc[users['_id'] == uid].empty else "Unknown",
-              score)
-             for uid, score in pr.items()],
-            columns=["_id", "name", "pagerank"]
-        )
+        pr_df = pd.DataFrame({
+            "_id": list(pr),
+            "name": [name_by_id.get(uid, "Unknown") for uid in pr],
+            "pagerank": list(pr.values()),
+        })
         pr_df.to_csv(csv_out, index=False)
         print(f"Wrote {csv_out}")
     return pr, pr_top
@@ -59,19 +86,18 @@ def pagerank_with_names(G, users, top_k=10, csv_out=None):
 # ----------------------------
 # Community Detection
 # ----------------------------
-def detect_communities(G, users, community_louvain_module=None, csv_out=None):
-    if community_louvain_module:
-        partition = community_louvain_module.best_partition(G, weight="weight")
+def detect_communities(G, users, csv_out=None, use_gpu=False, seed=42):
+    partition, _, _ = community_partition(G, use_gpu=use_gpu, seed=seed)
+    if partition is not None:
         communities = set(partition.values())
         print(f"\nLouvain communities found: {len(communities)}")
         if csv_out:
-            comm_df = pd.DataFrame(
-                [(uid,
-                  users.loc[users["_id"] == uid, "name"].iloc[0] if not users.loc[users["_id"] == uid].empty else "Unknown",
-                  comm)
-                 for uid, comm in partition.items()],
-                columns=["_id", "name", "louvain_comm"]
-            )
+            name_by_id = names_by_id(users)
+            comm_df = pd.DataFrame({
+                "_id": list(partition),
+                "name": [name_by_id.get(uid, "Unknown") for uid in partition],
+                "louvain_comm": list(partition.values()),
+            })
             comm_df.to_csv(csv_out, index=False)
             print(f"Wrote {csv_out}")
         return partition
@@ -83,33 +109,60 @@ def detect_communities(G, users, community_louvain_module=None, csv_out=None):
 # ----------------------------
 # Friend Recommendation
 # ----------------------------
-def recommend_friends(G, users, user_id, top_k=5):
+def neighbor_sets(G):
+    """frozenset of neighbours per node, built once and shared by every recommendation."""
+    return {n: frozenset(G[n]) for n in G.nodes()}
+
+
+def user_features(G, users):
+    """
+    (city, language set, interest set) maps per user id in G, first row per id
+    (as the old per-candidate lookup did), from the precomputed set columns;
+    built once and shared by every recommendation.
+    """
+    first = users.drop_duplicates("_id")
+    first = first[first["_id"].isin(list(G.nodes()))]
+
+    def column(name):
+        return first[name] if name in first else pd.Series("", index=first.index)
+
+    def sets(attr):
+        col = LIST_SET_COLUMNS[attr]
+        return first[col] if col in first else list_field_sets(column(attr), attr)
+
+    ids = first["_id"].tolist()
+    city_map = dict(zip(ids, column("city").astype(str)))
+    lang_map = dict(zip(ids, sets("languages")))
+    int_map = dict(zip(ids, sets("interests")))
+    return city_map, lang_map, int_map
+
+
+def recommend_friends(G, users, user_id, top_k=5, nbrs=None, features=None):
     if user_id not in G:
         return []
-    current_friends = set(G.neighbors(user_id))
-    candidates = set(G.nodes()) - current_friends - {user_id}
-    user_row = users[users["_id"] == user_id]
-    if user_row.empty:
+    if features is None:
+        features = user_features(G, users)
+    city_map, lang_map, int_map = features
+    if user_id not in city_map:
         return []
-    user_row = user_row.iloc[0]
-    user_langs = set(lang['code'] for lang in parse_list_field(user_row.get("languages", [])))
-    user_city = str(user_row.get("city", ""))
-    user_interests = set(parse_list_field(user_row.get("interests", [])))
+
+    if nbrs is None:
+        nbrs = neighbor_sets(G)
+    current_friends = nbrs[user_id]
+    candidates = set(G.nodes()) - current_friends - {user_id}
+    user_langs = lang_map[user_id]
+    user_city = city_map[user_id]
+    user_interests = int_map[user_id]
     scored = []
     for cand in candidates:
-        cand_row = users[users["_id"] == cand]
-        if cand_row.empty:
+        if cand not in city_map:
             continue
-        cand_row = cand_row.iloc[0]
         score = 0
-        if str(cand_row.get("city", "")) == user_city:
+        if city_map[cand] == user_city:
             score += 1
-        cand_langs = set(lang['code'] for lang in parse_list_field(cand_row.get("languages", [])))
-        score += len(user_langs & cand_langs)
-        cand_interests = set(parse_list_field(cand_row.get("interests", [])))
-        score += len(user_interests & cand_interests)
-        common_neighbors = len(list(nx.common_neighbors(G, user_id, cand)))
-        score += common_neighbors
+        score += len(user_langs & lang_map[cand])
+        score += len(user_interests & int_map[cand])
+        score += len(current_friends & nbrs[cand])
         if score > 0:
             scored.append((cand, score))
     scored.sort(key=lambda x: x[1], reverse=True)
@@ -119,11 +172,13 @@ def recommend_friends(G, users, user_id, top_k=5):
 # Main Demo
 # ----------------------------
 if __name__ == '__main__':
-    edges = pd.read_csv("data/edges.csv")
-    users = pd.read_csv("data/users.csv")
+    edges = pd.read_csv("data/edges.csv", engine=CSV_ENGINE)
+    # joinedAt pinned to str: pyarrow would otherwise turn it into date objects
+    users = pd.read_csv("data/users.csv", engine=CSV_ENGINE, dtype={"joinedAt": str})
     edges["src"] = edges["src"].astype(str)
     edges["dst"] = edges["dst"].astype(str)
     users["_id"] = users["_id"].astype(str)
+    add_list_field_sets(users)
 
     friend_edges = edges[edges["type"] == "friend"][["src", "dst", "weight"]]
     G = nx.Graph()
@@ -135,20 +190,16 @@ if __name__ == '__main__':
     pr, pr_top = pagerank_with_names(G, users, top_k=10, csv_out="data/pagerank.csv")
 
     # Communities
-    try:
-        import community as community_louvain
-    except ImportError:
-        community_louvain = None
-    detect_communities(G, users, community_louvain, csv_out="data/communities.csv")
+    detect_communities(G, users, csv_out="data/communities.csv")
 
     # Friend recommendations for top node
     if pr_top:
         example_user = pr_top[0][0]
         print(f"\nFriend recommendations for {example_user}:")
-        for cand, score in recommend_friends(G, users, example_user, top_k=5):
-            name_row = users.loc[users["_id"] == cand, "name"]
-            name = name_row.iloc[0] if not name_row.empty else "Unknown"
-            print(f"  {cand} ({name}) score={score}")
+        names = names_by_id(users)
+        for cand, score in recommend_friends(G, users, example_user, top_k=5, nbrs=neighbor_sets(G),
+                                             features=user_features(G, users)):
+            print(f"  {cand} ({names.get(cand, 'Unknown')}) score={score}")
 
     # Subgraph example
     sub_g, sub_users = multi_attribute_subgraph(
@@ -160,11 +211,11 @@ if __name__ == '__main__':
     print("\n--- SUBGRAPH (Mumbai + Music + en) ---")
     print("Nodes:", sub_g.number_of_nodes(), "Edges:", sub_g.number_of_edges())
     pr_sub, pr_top_sub = pagerank_with_names(sub_g, sub_users, top_k=5)
-    detect_communities(sub_g, sub_users, community_louvain)
+    detect_communities(sub_g, sub_users)
     if pr_top_sub:
         example_user = pr_top_sub[0][0]
         print(f"\nFriend recommendations (sub) for {example_user}:")
-        for cand, score in recommend_friends(sub_g, sub_users, example_user, top_k=5):
-            name_row = sub_users.loc[sub_users["_id"] == cand, "name"]
-            name = name_row.iloc[0] if not name_row.empty else "Unknown"
-            print(f"  {cand} ({name}) score={score}")
+        sub_names = names_by_id(sub_users)
+        for cand, score in recommend_friends(sub_g, sub_users, example_user, top_k=5, nbrs=neighbor_sets(sub_g),
+                                             features=user_features(sub_g, sub_users)):
+            print(f"  {cand} ({sub_names.get(cand, 'Unknown')}) score={score}")
@@ -1,17 +1,22 @@
 import pandas as pd
 
 # === Load Data ===
+# Only the id columns are needed; reading both files as strings keeps the
+# membership test a plain hash lookup on matching dtypes (no int/object upcasts).
 edges = pd.read_csv(
-    r"C:\Users\p2123\Desktop\COLLEGE\PROJECT_3rdYear\Social_Network_Project\data\edges.csv"
+    r"C:\Users\p2123\Desktop\COLLEGE\PROJECT_3rdYear\Social_Network_Project\data\edges.csv",
+    usecols=["src", "dst"], dtype={"src": str, "dst": str}
 )
 top_nodes = pd.read_csv(
-    r"C:\Users\p2123\Desktop\COLLEGE\PROJECT_3rdYear\Social_Network_Project\data\top_200_influential_nodes.csv"
+    r"C:\Users\p2123\Desktop\COLLEGE\PROJECT_3rdYear\Social_Network_Project\data\top_200_influential_nodes.csv",
+    usecols=["Node"], dtype={"Node": str}
 )
+top_set = set(top_nodes["Node"])
 
 # === Filter edges connecting only top 200 nodes ===
 filtered_edges = edges[
-    edges["src"].isin(top_nodes["Node"]) & edges["dst"].isin(top_nodes["Node"])
-][["src", "dst"]]  # keep only 2 columns
+    edges["src"].isin(top_set) & edges["dst"].isin(top_set)
+]  # already only src & dst
 
 # === Save for visualization ===
 filtered_edges.to_csv(
@@ -1,15 +1,19 @@
 import pandas as pd
 import networkx as nx
 from pyvis.network import Network
+from jinja2 import ChoiceLoader, DictLoader, Environment   # installed with pyvis
 import os, io, webbrowser
 
+from csv_engine import CSV_ENGINE
+
 # === Step 1: Load main graph data ===
 edges_path = "../data/edges.csv"
 users_path = "../data/users.csv"
 
 try:
-    edges_df = pd.read_csv(edges_path)
-    users_df = pd.read_csv(users_path)
+    edges_df = pd.read_csv(edges_path, engine=CSV_ENGINE)
+    # joinedAt pinned to str: pyarrow would otherwise turn it into date objects
+    users_df = pd.read_csv(users_path, engine=CSV_ENGINE, dtype={"joinedAt": str})
 except FileNotFoundError:
     print("❌ Could not find edges.csv or users.csv. Please check paths.")
     exit()
@@ -92,26 +96,28 @@ net.set_options("""
 """)
 
 # === Step 5: Add nodes and edges ===
-for node in G.nodes():
-    node_id = str(node)
-    degree = G.degree(node)
-
-    if node_id in highlight_nodes:
-        color = "#FF0000"
-        size = 25
-    else:
-        color = "skyblue"
-        size = 8 + degree * 0.4
-
-    net.add_node(
-        node_id,
-        title=f"<b>Node:</b> {node_id}<br>Degree: {degree}",
-        color=color,
-        size=size
-    )
-
-for u, v, data in G.edges(data=True):
-    net.add_edge(str(u), str(v), color="gray", width=0.8)
+# Fill PyVis' lists directly: add_node/add_edge check membership against plain
+# lists (and add_edge rescans every edge for duplicates), which is quadratic.
+# The dicts below are exactly what those calls would have appended.
+degrees = dict(G.degree())
+node_ids = [str(n) for n in G.nodes()]
+net.nodes = [
+    {
+        "title": f"<b>Node:</b> {node_id}<br>Degree: {degrees[n]}",
+        "size": 25 if node_id in highlight_nodes else 8 + degrees[n] * 0.4,
+        "label": node_id,
+        "color": "#FF0000" if node_id in highlight_nodes else "skyblue",
+        "id": node_id,
+        "shape": "dot",
+        "font": {"color": net.font_color},
+    }
+    for n, node_id in zip(G.nodes(), node_ids)
+]
+net.node_ids = node_ids
+net.node_map = {opts["id"]: opts for opts in net.nodes}
+
+# G is a simple graph, so there are no duplicate edges for PyVis to filter out
+net.edges = [{"color": "gray", "width": 0.8, "from": str(u), "to": str(v)} for u, v in G.edges()]
 
 # === Step 6: Add floating legend ===
 legend_html = """
@@ -137,13 +143,18 @@ legend_html = """
 
 output_path = os.path.abspath("../data/highlighted_nodes_network.html")
 
+# Put the legend into PyVis' page template (a few KB) once, so the rendered page
+# (megabytes of node/edge JSON) is produced and written in a single pass
+template_src = net.templateEnv.loader.get_source(net.templateEnv, net.path)[0]
+net.templateEnv = Environment(loader=ChoiceLoader([
+    DictLoader({net.path: template_src.replace("</body>", legend_html + "\n</body>")}),
+    net.templateEnv.loader,   # files the page template includes
+]))
+
 # === Step 7: Save and open ===
 try:
-    html_content = net.generate_html()
-    html_content = html_content.replace("</body>", legend_html + "\n</body>")
-
-    with io.open(output_path, mode="w", encoding="utf-8") as f:
-        f.write(html_content)
+    with io.open(output_path, mode="w", encoding="utf-8", buffering=1 << 20) as f:
+        f.write(net.generate_html())
 
     print(f"✅ Visualization created successfully → {output_path}")
     webbrowser.open(f"file://{output_path}")
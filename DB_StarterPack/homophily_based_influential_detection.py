@@ -1,18 +1,29 @@
 ### !! DOESNOT COMPUTE EIGENVECTOR CENTRALITY
 
+import numpy as np
 import pandas as pd
 import networkx as nx
 import random
 
+from csv_engine import CSV_ENGINE
+from neighbor_jaccard import avg_neighbor_jaccard
+
+try:
+    import igraph as ig
+except ImportError:
+    ig = None
+
 # ===============================
 # 1. Load Graph
 # ===============================
-edges_df = pd.read_csv(r"C:\Users\p2123\Desktop\COLLEGE\PROJECT_3rdYear\Social_Network_Project\data\edges.csv")
+# Typed read: ids as strings (no int inference + conversion), "type" is never used
+edges_df = pd.read_csv(r"C:\Users\p2123\Desktop\COLLEGE\PROJECT_3rdYear\Social_Network_Project\data\edges.csv",
+                       engine=CSV_ENGINE, dtype={"src": str, "dst": str})
+edges_df = edges_df.drop(columns="type", errors="ignore")
 
-# Build undirected weighted graph
-G = nx.Graph()
-for _, row in edges_df.iterrows():
-    G.add_edge(row["src"], row["dst"], weight=row.get("weight", 1.0))
+# Build undirected weighted graph (missing weights default to 1.0), one vectorized pass
+edges_df = edges_df.assign(weight=edges_df["weight"].fillna(1.0) if "weight" in edges_df.columns else 1.0)
+G = nx.from_pandas_edgelist(edges_df, "src", "dst", edge_attr="weight", create_using=nx.Graph())
 
 print(f"Graph loaded: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
 
@@ -25,8 +36,34 @@ print("Calculating centrality measures...")
 degree_centrality = nx.degree_centrality(G)
 
 # Approximate betweenness centrality (faster)
+def sampled_betweenness(G, k, seed):
+    """
+    nx.betweenness_centrality(G, k=k, normalized=True, seed=seed) on igraph's C
+    Brandes: same sampled sources, same (networkx 3.5+) rescaling of the raw sums.
+    """
+    nodes = list(G.nodes())
+    n = len(nodes)
+    sources = None if k >= n else random.Random(seed).sample(nodes, k)
+    idx = {v: i for i, v in enumerate(nodes)}
+    gi = ig.Graph(n=n, edges=[(idx[u], idx[v]) for u, v in G.edges()], directed=G.is_directed())
+    raw = np.asarray(gi.betweenness(directed=G.is_directed(),
+                                    sources=None if sources is None else [idx[v] for v in sources]))
+    if not G.is_directed():
+        raw = 2 * raw  # networkx sums over ordered (s, t) pairs
+    if n < 3:
+        return dict(zip(nodes, raw.tolist()))
+    if sources is None:
+        scale = np.full(n, 1.0 / ((n - 1) * (n - 2)))
+    else:
+        scale = np.full(n, 1.0 / (k * (n - 2)))
+        scale[[idx[v] for v in sources]] = 1.0 / ((k - 1) * (n - 2)) if k > 1 else np.nan
+    return dict(zip(nodes, (raw * scale).tolist()))
+
 sample_size = min(300, len(G))
-betweenness_centrality = nx.betweenness_centrality(G, k=sample_size, normalized=True, seed=42)
+if ig is not None:
+    betweenness_centrality = sampled_betweenness(G, sample_size, seed=42)
+else:
+    betweenness_centrality = nx.betweenness_centrality(G, k=sample_size, normalized=True, seed=42)
 
 # Combine both (equal weighting)
 combined_centrality = {
@@ -39,22 +76,9 @@ combined_centrality = {
 # ===============================
 print("Calculating structural homophily...")
 
-homophily = {}
-for node in G.nodes():
-    neighbors = list(G.neighbors(node))
-    if not neighbors:
-        homophily[node] = 0
-        continue
-
-    node_neighbors = set(neighbors)
-    sims = []
-    for nbr in neighbors:
-        nbr_neighbors = set(G.neighbors(nbr))
-        intersection = len(node_neighbors & nbr_neighbors)
-        union = len(node_neighbors | nbr_neighbors)
-        sim = intersection / union if union != 0 else 0
-        sims.append(sim)
-    homophily[node] = sum(sims) / len(sims)
+nodes = list(G.nodes())
+A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=None, format="csr")
+homophily = dict(zip(nodes, avg_neighbor_jaccard(A).tolist()))
 
 # ===============================
 # 4. Combine Influence Score
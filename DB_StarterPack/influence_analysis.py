@@ -18,6 +18,8 @@ import pandas as pd
 import networkx as nx
 from sklearn.preprocessing import MinMaxScaler
 
+from influence_graph import build_graph
+
 # ----------------------------
 # Path Setup
 # ----------------------------
@@ -33,18 +35,7 @@ output_path = os.path.join(DATA_DIR, "centrality_influence_scores.csv")
 edges_df = pd.read_csv(edges_path)
 
 # Create directed graph (for follow) + mutual edges (for friend)
-G = nx.DiGraph()
-for _, row in edges_df.iterrows():
-    src, dst = str(row["src"]), str(row["dst"])
-    edge_type = row.get("type", "friend")
-    weight = float(row.get("weight", 1.0))
-
-    if edge_type == "friend":
-        # bidirectional friendship
-        G.add_edge(src, dst, weight=weight)
-        G.add_edge(dst, src, weight=weight)
-    else:
-        G.add_edge(src, dst, weight=weight)
+G = build_graph(edges_df)
 
 print(f"✅ Graph loaded: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
 
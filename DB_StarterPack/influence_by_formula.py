@@ -2,14 +2,38 @@
 # Same behaviour as original but optimized for larger graphs (approx betweenness, faster k-hop & homophily)
 
 import os
+import math
+import hashlib
+import warnings
 import pandas as pd
 import networkx as nx
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler
-from collections import deque
+from scipy import sparse
+from scipy.sparse.csgraph import shortest_path, connected_components, reverse_cuthill_mckee
+from scipy.sparse.linalg import eigs
 import random
 import time
-from tqdm import tqdm
+
+from csv_engine import CSV_ENGINE
+from influence_graph import build_graph
+from neighbor_jaccard import avg_neighbor_jaccard, jaccard_rows
+from pagerank_csr import pagerank_csr
+
+try:
+    import igraph as ig
+except ImportError:
+    ig = None
+
+try:
+    from joblib import Parallel, delayed, effective_n_jobs   # optional: spreads per-node work over processes
+except ImportError:
+    Parallel = None
+
+try:
+    import cudf       # optional: GPU backend (USE_GPU)
+    import cugraph
+except ImportError:
+    cugraph = None
 
 # --------------------------
 # CONFIG FLAGS
@@ -18,7 +42,20 @@ USE_GENERATED_ACTIVENESS = True   # True = use random weekly activeness
 RANDOM_SEED = 42                  # for reproducibility
 COMPUTE_BETWEENNESS = True        # set False to skip betweenness
 BETWEENNESS_SAMPLE_K = None       # if None and graph large, script picks a sensible sample
+USE_KADABRA = False               # large graphs: sample random shortest paths with an (eps, delta) guarantee
+BETWEENNESS_EPS = 0.02            #   max absolute error of every normalized score ...
+BETWEENNESS_DELTA = 0.1           #   ... with probability 1 - delta
+CLOSENESS_PIVOTS = 200            # large graphs: Eppstein-Wang closeness from this many BFS pivots
 K_HOP = 3                         # for k-hop coverage
+KHOP_BITSET_MAX_BYTES = 1 << 30   # k-hop uses n x n bitsets (2 * n^2 / 8 bytes) up to this size
+CANDIDATE_K = None                # if set: K and H only for the top-N PageRank nodes (rest 0, "approx" column)
+REORDER_RCM = False               # run k-hop/homophily on a Reverse Cuthill-McKee ordering (locality)
+USE_GPU = False                   # betweenness / eigenvector / homophily on the GPU via RAPIDS cuGraph
+USE_MINHASH = False               # large graphs: estimate neighbour Jaccard from MinHash signatures
+MINHASH_PERMS = 128               #   signature length (std. error ~ 1/sqrt(MINHASH_PERMS))
+N_JOBS = -1                       # joblib workers for per-node metrics (-1 = all cores)
+PARALLEL_MIN_NODES = 5000         # below this, process start-up costs more than it saves
+USE_CACHE = True                  # reuse metric arrays from data/.cache when edges file + settings match
 
 random.seed(RANDOM_SEED)
 np.random.seed(RANDOM_SEED)
@@ -39,177 +76,548 @@ output_path = os.path.join(DATA_DIR, "influence_scores_formula_200.csv")
 if not os.path.exists(edges_path):
     raise FileNotFoundError(f"Edges file not found: {edges_path}")
 
-edges_df = pd.read_csv(edges_path)
+# ids are only ever used as strings, so read them that way instead of inferring
+# ints and converting back; "type" has a handful of values -> category.
+# weight stays float64 (it is a path length for betweenness; build_graph coerces it).
+edges_df = pd.read_csv(edges_path, engine=CSV_ENGINE, dtype={"src": str, "dst": str, "type": "category"})
 
 # --------------------------
 # BUILD GRAPH (directed with friend -> two-way)
 # --------------------------
-G = nx.DiGraph()
-for _, row in edges_df.iterrows():
-    src, dst = str(row["src"]), str(row["dst"])
-    e_type = row.get("type", "friend")
-    try:
-        w = float(row.get("weight", 1.0))
-    except Exception:
-        w = 1.0
-
-    if e_type == "friend":
-        G.add_edge(src, dst, weight=w)
-        G.add_edge(dst, src, weight=w)
-    else:
-        G.add_edge(src, dst, weight=w)
+G = build_graph(edges_df)
 
 print(f"Graph loaded: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
 
 nodes_list = list(G.nodes())
+node_index = {n: i for i, n in enumerate(nodes_list)}
 n_nodes = len(nodes_list)
 
+# String ids are hashed once here: every metric below runs on int32 positions in
+# nodes_list (edge arrays / CSR) and nodes_list maps them back when saving.
+W_coo = nx.to_scipy_sparse_array(G, nodelist=nodes_list, weight="weight", dtype=np.float64, format="coo")
+edge_src = W_coo.row.astype(np.int32)
+edge_dst = W_coo.col.astype(np.int32)
+edge_w = W_coo.data
+
 # --------------------------
-# ACTIVENESS GENERATOR (unchanged)
+# ACTIVENESS GENERATOR
 # --------------------------
-def generate_weekly_activeness(nodes):
-    act_map = {}
-    for n in nodes:
-        r = random.random()
-        if r < 0.60:
-            base = random.uniform(0.10, 0.50)
-        elif r < 0.90:
-            base = random.uniform(0.50, 0.80)
-        else:
-            base = random.uniform(0.80, 1.00)
-        weekly = base + random.uniform(-0.05, 0.05)
-        weekly = max(0, min(1, weekly))
-        act_map[n] = weekly
-    return pd.DataFrame({"node": list(act_map.keys()), "A": list(act_map.values())})
+def generate_weekly_activeness(nodes, seed=RANDOM_SEED):
+    """
+    Random weekly activeness per node: 60% low (0.10-0.50), 30% mid (0.50-0.80),
+    10% high (0.80-1.00), plus +/-0.05 noise, clipped to [0, 1]. All draws are
+    made at once from a seeded NumPy generator.
+    """
+    n = len(nodes)
+    rng = np.random.default_rng(seed)
+    r = rng.random(n)
+    base = np.select([r < 0.60, r < 0.90],
+                     [rng.uniform(0.10, 0.50, n), rng.uniform(0.50, 0.80, n)],
+                     default=rng.uniform(0.80, 1.00, n))
+    weekly = np.clip(base + rng.uniform(-0.05, 0.05, n), 0, 1)
+    return pd.DataFrame({"node": list(nodes), "A": weekly})
+
+def map_node_blocks(fn, n, block, *args):
+    """
+    Concatenate fn(r0, r1, *args) over consecutive node blocks [r0, r1). Blocks are
+    independent, so on large graphs they run in joblib worker processes.
+    """
+    bounds = [(r0, min(r0 + block, n)) for r0 in range(0, n, block)]
+    if Parallel is not None and n >= PARALLEL_MIN_NODES:
+        parts = Parallel(n_jobs=N_JOBS)(delayed(fn)(r0, r1, *args) for r0, r1 in bounds)
+    else:
+        parts = [fn(r0, r1, *args) for r0, r1 in bounds]
+    return np.concatenate(parts) if parts else np.zeros(0)
+
+# --------------------------
+# METRIC CACHE (keyed on the edges file contents + the settings each metric depends on)
+# --------------------------
+def file_digest(path, chunk=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()[:12]
+
+CACHE_DIR = os.path.join(DATA_DIR, ".cache", file_digest(edges_path)) if USE_CACHE else None
+BET_PARAMS = (COMPUTE_BETWEENNESS, BETWEENNESS_SAMPLE_K, USE_KADABRA, BETWEENNESS_EPS, BETWEENNESS_DELTA,
+              RANDOM_SEED, USE_GPU)
+EIGEN_PARAMS = (USE_GPU,)
+CLOSENESS_PARAMS = (CLOSENESS_PIVOTS, RANDOM_SEED)
+KHOP_PARAMS = (K_HOP, CANDIDATE_K)
+HOMOPHILY_PARAMS = (CANDIDATE_K, USE_MINHASH, MINHASH_PERMS, RANDOM_SEED, USE_GPU)
+
+def cache_path(name, params):
+    return os.path.join(CACHE_DIR, f"{name}-{hashlib.sha1(repr(params).encode()).hexdigest()[:8]}.npy")
+
+def cache_load(name, params):
+    """Per-node array saved by an earlier run with the same inputs, else None."""
+    if CACHE_DIR is None or not os.path.exists(cache_path(name, params)):
+        return None
+    print(f"Loaded {name} from cache")
+    return np.load(cache_path(name, params))
+
+def cache_save(name, params, values):
+    if CACHE_DIR is not None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        np.save(cache_path(name, params), values)
 
 # --------------------------
 # CENTRALITY MEASURES
 # --------------------------
 print("\nComputing centralities...")
 
+# weighted (eigenvector) and binary (components, undirected view) CSR share one sparsity pattern
+W = W_coo.tocsr()
+A_dir = sparse.csr_array((np.ones(W.nnz, dtype=np.float32), W.indices, W.indptr), shape=W.shape)
+
 # 1) Betweenness (approximate if graph large)
-bet = {}
-if COMPUTE_BETWEENNESS:
-    print("Computing betweenness...")
-    start = time.time()
-    # if few nodes, do exact; otherwise approximate using sampling
-    if n_nodes <= 5000:
-        try:
-            bet = nx.betweenness_centrality(G, weight="weight", normalized=True)
-        except Exception as e:
-            print("Exact betweenness failed, falling back to approximation:", e)
-            bet = {n: 0.0 for n in nodes_list}
+def int_igraph():
+    """igraph copy of G built straight from the int edge arrays."""
+    return ig.Graph(n=n_nodes, edges=np.column_stack([edge_src, edge_dst]).tolist(), directed=True)
+
+def brandes_counts(gi, weights=None, sources=None):
+    """
+    Raw Brandes sums per node (shortest s-t paths through it, over ordered pairs,
+    s restricted to the int ids in `sources` if given), computed by igraph's C
+    implementation. These are the numbers networkx accumulates before rescaling.
+    """
+    src = None if sources is None else [int(s) for s in sources]
+    return np.asarray(gi.betweenness(weights=weights, directed=True, sources=src), dtype=float)
+
+def source_chunks(sources):
+    """Split Brandes sources into one chunk per joblib worker (None when running serially)."""
+    if Parallel is None or n_nodes < PARALLEL_MIN_NODES:
+        return None
+    n_chunks = min(effective_n_jobs(N_JOBS), len(sources))
+    return [list(c) for c in np.array_split(np.asarray(sources, dtype=object), n_chunks) if len(c)]
+
+def normalized_betweenness(sources=None):
+    """Same values as nx.betweenness_centrality(_subset)(G, ..., normalized=True, weight="weight"),
+    as an array over nodes_list; `sources` are int ids."""
+    gi, w = int_igraph(), edge_w.tolist()
+    chunks = source_chunks(range(n_nodes) if sources is None else sources)
+    if chunks and len(chunks) > 1:
+        # per-source dependencies add up, so each worker handles a slice of the sources
+        raw = sum(Parallel(n_jobs=N_JOBS)(delayed(brandes_counts)(gi, w, chunk) for chunk in chunks))
+    else:
+        raw = brandes_counts(gi, w, sources=sources)
+    scale = 1.0 / ((n_nodes - 1) * (n_nodes - 2)) if n_nodes > 2 else 1.0
+    return raw * scale
+
+def path_sample_betweenness(G, eps=BETWEENNESS_EPS, delta=BETWEENNESS_DELTA, seed=RANDOM_SEED):
+    """
+    Riondato-Kornaropoulos estimate of normalized betweenness. Draw r random (s, t)
+    pairs, pick one shortest s-t path uniformly at random and credit its interior
+    nodes. r comes from the VC-dimension bound, so every score is within eps of the
+    exact value with probability 1 - delta, however large the graph.
+    """
+    if n_nodes < 3:
+        return np.zeros(n_nodes)
+    # vertex-diameter bound: no shortest path has more nodes than the largest component
+    _, comp = connected_components(A_dir, directed=True, connection="weak")
+    vd = np.bincount(comp).max()
+    r = math.ceil(0.5 / eps ** 2 * (math.floor(math.log2(max(vd - 2, 1))) + 1 + math.log(1 / delta)))
+
+    rng = random.Random(seed)
+    targets_of = {}
+    for _ in range(r):
+        s = rng.randrange(n_nodes)
+        t = rng.randrange(n_nodes - 1)
+        targets_of.setdefault(s, []).append(t + (t >= s))
+
+    hits = np.zeros(n_nodes)
+    if ig is not None:
+        gi, w = int_igraph(), edge_w.tolist()
+        for s, targets in targets_of.items():
+            by_target = {}
+            with warnings.catch_warnings():   # igraph warns about unreachable targets
+                warnings.simplefilter("ignore", RuntimeWarning)
+                paths_from_s = gi.get_all_shortest_paths(s, to=sorted(set(targets)), weights=w, mode="out")
+            for path in paths_from_s:
+                by_target.setdefault(path[-1], []).append(path)
+            for t in targets:
+                paths = by_target.get(t)
+                if paths:   # unreachable pairs contribute nothing
+                    hits[paths[rng.randrange(len(paths))][1:-1]] += 1
+    else:
+        # private networkx helper (Dijkstra with predecessor lists and path counts); imported
+        # here so a networkx that moves it only breaks this off-by-default fallback
+        from networkx.algorithms.centrality.betweenness import _single_source_dijkstra_path_basic
+        for s, targets in targets_of.items():
+            source = nodes_list[s]
+            _, pred, sigma, _ = _single_source_dijkstra_path_basic(G, source, "weight")
+            for t in targets:
+                v = nodes_list[t]
+                if not pred[v]:   # unreachable
+                    continue
+                # walk back, choosing each predecessor with probability sigma[p] / sigma[v]
+                while True:
+                    v = rng.choices(pred[v], weights=[sigma[p] for p in pred[v]])[0]
+                    if v == source:
+                        break
+                    hits[node_index[v]] += 1
+    # hits / r estimates the ordered-pair average over n(n-1); networkx divides by (n-1)(n-2)
+    return hits / r * n_nodes / (n_nodes - 2)
+
+def by_node(scores):
+    """Array over nodes_list from a networkx {node: value} result (missing -> 0)."""
+    return np.array([scores.get(n, 0.0) for n in nodes_list], dtype=float)
+
+# --- optional GPU backend: cuGraph on the same int ids (renumber=False) ---
+use_gpu = USE_GPU and cugraph is not None
+if USE_GPU and cugraph is None:
+    print("cugraph not available; computing centralities on CPU.")
+
+def gpu_graph(directed=True, store_transposed=False):
+    """cuGraph copy of G from the int edge arrays; vertex ids are positions in nodes_list."""
+    gdf = cudf.DataFrame({"src": edge_src, "dst": edge_dst, "weight": edge_w})
+    Gg = cugraph.Graph(directed=directed)
+    Gg.from_cudf_edgelist(gdf, source="src", destination="dst", edge_attr="weight",
+                          renumber=False, store_transposed=store_transposed)
+    return Gg
+
+def gpu_by_node(result, column):
+    """Array over nodes_list from a cuGraph (vertex, column) result."""
+    res = result.to_pandas()
+    out = np.zeros(n_nodes)
+    out[res["vertex"].to_numpy()] = res[column].to_numpy()
+    return out
+
+bet = cache_load("betweenness", BET_PARAMS)
+if bet is None:
+    if COMPUTE_BETWEENNESS:
+        print("Computing betweenness...")
+        start = time.time()
+        # cuGraph's betweenness is unweighted, so only use it when all weights are equal
+        if use_gpu and np.all(edge_w == edge_w[:1]):
+            try:
+                k_gpu = None if n_nodes <= 5000 else BETWEENNESS_SAMPLE_K or min(250, max(50, n_nodes // 60))
+                bet = gpu_by_node(cugraph.betweenness_centrality(gpu_graph(), k=k_gpu, normalized=True,
+                                                                 seed=RANDOM_SEED), "betweenness_centrality")
+            except Exception as e:
+                print("cuGraph betweenness failed, using CPU:", e)
+        # if few nodes, do exact; otherwise approximate using sampling
+        if bet is not None:
+            pass
+        elif n_nodes <= 5000:
+            if ig is not None:
+                try:
+                    bet = normalized_betweenness()
+                except Exception as e:
+                    print("igraph betweenness failed, using networkx:", e)
+            if bet is None:
+                try:
+                    bet = by_node(nx.betweenness_centrality(G, weight="weight", normalized=True))
+                except Exception as e:
+                    print("Exact betweenness failed, falling back to approximation:", e)
+        elif USE_KADABRA:
+            print(f"Graph large ({n_nodes} nodes). Sampling shortest paths (eps={BETWEENNESS_EPS}, delta={BETWEENNESS_DELTA})")
+            bet = path_sample_betweenness(G)
+        else:
+            # choose k sample size
+            k_sample = BETWEENNESS_SAMPLE_K
+            if k_sample is None:
+                k_sample = min(250, max(50, n_nodes // 60))  # heuristic: scale with graph size
+            print(f"Graph large ({n_nodes} nodes). Using approximate betweenness with sample k={k_sample}")
+            import random as _rnd
+            _rnd.seed(RANDOM_SEED)
+            sample_sources = _rnd.sample(nodes_list, min(k_sample, n_nodes))
+            if ig is not None:
+                try:
+                    bet = normalized_betweenness(sources=[node_index[s] for s in sample_sources])
+                except Exception as e:
+                    print("igraph betweenness failed, using networkx:", e)
+            if bet is None:
+                try:
+                    # use betweenness_centrality_subset for sampled sources -> cheaper
+                    chunks = source_chunks(sample_sources)
+                    if chunks and len(chunks) > 1:
+                        # the subset scores are linear in the sources: sum per-chunk results
+                        parts = Parallel(n_jobs=N_JOBS)(
+                            delayed(nx.betweenness_centrality_subset)(G, sources=chunk, targets=nodes_list, normalized=True, weight='weight')
+                            for chunk in chunks)
+                        bet = sum(by_node(part) for part in parts)
+                    else:
+                        bet = by_node(nx.betweenness_centrality_subset(G, sources=sample_sources, targets=nodes_list, normalized=True, weight='weight'))
+                except Exception as e:
+                    print("Approx betweenness subset failed:", e)
+        print(f" Betweenness done in {time.time()-start:.1f}s")
+    if bet is None:
+        bet = np.zeros(n_nodes)   # skipped or failed: not cached, so the next run computes it
     else:
-        # choose k sample size
-        k_sample = BETWEENNESS_SAMPLE_K
-        if k_sample is None:
-            k_sample = min(250, max(50, n_nodes // 60))  # heuristic: scale with graph size
-        print(f"Graph large ({n_nodes} nodes). Using approximate betweenness with sample k={k_sample}")
-        import random as _rnd
-        _rnd.seed(RANDOM_SEED)
-        sample_sources = _rnd.sample(nodes_list, min(k_sample, n_nodes))
+        cache_save("betweenness", BET_PARAMS, bet)
+
+# 2) Eigenvector (per weakly-connected component)
+def arpack_eigenvector(W):
+    """
+    nx.eigenvector_centrality_numpy on a weighted CSR block: ARPACK (scipy eigs) for
+    the leading left eigenvector, sign-fixed and scaled to unit L2 norm. Only
+    mat-vec products with W, so O(iterations * nnz) time and O(nnz) memory.
+    """
+    if connected_components(W, directed=True, connection="strong")[0] != 1:
+        raise ValueError("not strongly connected")   # networkx refuses these too
+    _, vec = eigs(W.T, k=1, which="LR", maxiter=50, tol=0)
+    largest = vec.ravel().real
+    return largest / (np.sign(largest.sum()) * np.linalg.norm(largest))
+
+def power_eigenvector(W, max_iter=500, tol=1e-6):
+    """nx.eigenvector_centrality (power iteration with A + I) as sparse mat-vecs."""
+    n = W.shape[0]
+    WT = W.T.tocsr()
+    x = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        xlast = x
+        x = xlast + WT @ xlast
+        x /= np.linalg.norm(x) or 1
+        if np.abs(x - xlast).sum() < n * tol:
+            return x
+    raise nx.PowerIterationFailedConvergence(max_iter)
+
+eigen = cache_load("eigenvector", EIGEN_PARAMS)
+if eigen is None:
+    print("Computing eigenvector centrality per weak component...")
+    n_comps, comp_of = connected_components(A_dir, directed=True, connection="weak")
+    if use_gpu and n_comps == 1:   # cuGraph scales over the whole graph, so only one component
         try:
-            # use betweenness_centrality_subset for sampled sources -> cheaper
-            bet = nx.betweenness_centrality_subset(G, sources=sample_sources, targets=nodes_list, normalized=True, weight='weight')
+            eigen = gpu_by_node(cugraph.eigenvector_centrality(gpu_graph(store_transposed=True), max_iter=500, tol=1e-6),
+                                "eigenvector_centrality")
         except Exception as e:
-            print("Approx betweenness subset failed:", e)
-            # fallback: compute zero or very approximate degree-based proxy
-            bet = {n: 0.0 for n in nodes_list}
-    print(f" Betweenness done in {time.time()-start:.1f}s")
+            print("cuGraph eigenvector failed, using CPU:", e)
+    failed = False
+    if eigen is None:
+        eigen = np.zeros(n_nodes)
+        for members in np.split(np.argsort(comp_of, kind="stable"), np.cumsum(np.bincount(comp_of))[:-1]):
+            Wc = W[members][:, members]
+            try:
+                eigen[members] = arpack_eigenvector(Wc)
+            except Exception:
+                try:
+                    eigen[members] = power_eigenvector(Wc)
+                except Exception:
+                    failed = True   # leave zeros for nodes in this component
+    if failed:
+        print("Eigenvector failed for some components; zeros there, not cached")
+    else:
+        cache_save("eigenvector", EIGEN_PARAMS, eigen)
+
+# Undirected adjacency (edge in either direction), built once as a binary CSR and
+# shared by closeness, k-hop reach and homophily instead of G.to_undirected() copies
+A_sym = A_dir.maximum(A_dir.T).tocsr()
+A_sym.data[:] = 1.0
+
+# Optional locality pass for the k-hop and homophily kernels: renumber nodes so
+# neighbours get nearby ids (contiguous CSR slices / bitset words), then undo it.
+if REORDER_RCM:
+    rcm = reverse_cuthill_mckee(A_sym, symmetric_mode=True)
+    A_loc = A_sym[rcm][:, rcm]
 else:
-    bet = {n: 0.0 for n in nodes_list}
+    rcm, A_loc = None, A_sym
 
-# Ensure bet has entries for all nodes
-for n in nodes_list:
-    if n not in bet:
-        bet[n] = 0.0
-
-# 2) Eigenvector (per weakly-connected component)
-eigen = {}
-print("Computing eigenvector centrality per weak component...")
-for comp in nx.weakly_connected_components(G):
-    sub_nodes = list(comp)
-    sub = G.subgraph(sub_nodes)
-    try:
-        ev = nx.eigenvector_centrality_numpy(sub, weight="weight")
-        eigen.update(ev)
-    except Exception:
-        try:
-            ev = nx.eigenvector_centrality(sub, max_iter=500, tol=1e-6, weight="weight")
-            eigen.update(ev)
-        except Exception:
-            # on failure, set zero for nodes in this component
-            for n in sub_nodes:
-                eigen[n] = 0.0
-
-# fill missing nodes
-for n in nodes_list:
-    if n not in eigen:
-        eigen[n] = 0.0
+def in_node_order(values):
+    """Map per-node results computed on A_loc back to nodes_list order."""
+    if rcm is None:
+        return values
+    out = np.empty_like(values)
+    out[rcm] = values
+    return out
 
 # 3) Closeness (undirected)
 print("Computing closeness centrality (undirected)...")
-try:
-    closeness = nx.closeness_centrality(G.to_undirected())
-except Exception:
-    print("Closeness failed; setting zeros")
-    closeness = {n: 0.0 for n in nodes_list}
+def closeness_block(r0, r1, A):
+    """nx.closeness_centrality (wf_improved) for sources r0..r1-1, BFS hop distances from csgraph."""
+    n = A.shape[0]
+    dist = shortest_path(A, directed=False, unweighted=True, indices=np.arange(r0, r1))
+    reached = np.isfinite(dist)
+    r = reached.sum(axis=1) - 1.0                # reachable nodes other than the source
+    totsp = np.where(reached, dist, 0.0).sum(axis=1)
+    c = np.zeros(r1 - r0)
+    ok = totsp > 0
+    if n > 1:
+        c[ok] = (r[ok] / totsp[ok]) * (r[ok] / (n - 1))
+    return c
+
+def pivot_closeness(A, k=CLOSENESS_PIVOTS, seed=RANDOM_SEED):
+    """
+    Eppstein-Wang estimate of closeness_block over all nodes: BFS from k random
+    pivots only, and scale each node's summed distance to the pivots in its
+    component by (component size / pivots in it). O(k * m) instead of O(n * m).
+    Nodes whose component got no pivot are left at 0.
+    """
+    n = A.shape[0]
+    pivots = np.random.default_rng(seed).choice(n, size=min(k, n), replace=False)
+    dist = shortest_path(A, directed=False, unweighted=True, indices=pivots)
+    reached = np.isfinite(dist)
+    sum_dist = np.where(reached, dist, 0.0).sum(axis=0)
+    n_piv = reached.sum(axis=0)
+    _, comp = connected_components(A, directed=False)
+    r = np.bincount(comp)[comp] - 1.0                  # reachable nodes other than v
+    totsp = sum_dist * (r + 1) / np.maximum(n_piv, 1)   # estimated sum of distances
+    c = np.zeros(n)
+    ok = (n_piv > 0) & (totsp > 0)
+    if n > 1:
+        c[ok] = (r[ok] / totsp[ok]) * (r[ok] / (n - 1))
+    return c
+
+closeness = cache_load("closeness", CLOSENESS_PARAMS)
+if closeness is None:
+    try:
+        if n_nodes <= 5000:
+            closeness = map_node_blocks(closeness_block, n_nodes, 512, A_sym)
+        else:
+            print(f"Graph large ({n_nodes} nodes). Estimating closeness from {min(CLOSENESS_PIVOTS, n_nodes)} pivots")
+            closeness = pivot_closeness(A_sym)
+    except Exception:
+        print("Closeness failed; setting zeros (not cached)")
+        closeness = np.zeros(n_nodes)
+    else:
+        cache_save("closeness", CLOSENESS_PARAMS, closeness)
 
-# 4) Popularity P (degree)
-deg = dict(G.degree())
+# 4) Popularity P (degree = in + out, as G.degree() on the DiGraph)
+deg = np.bincount(edge_src, minlength=n_nodes) + np.bincount(edge_dst, minlength=n_nodes)
 
 # --------------------------
 # 5) K-hop coverage (optimized)
 # --------------------------
 print(f"Computing {K_HOP}-hop reach (optimized)...")
-# adjacency dict (undirected neighbors)
-G_und = G.to_undirected()
-adj = {n: set(G_und.neighbors(n)) for n in nodes_list}
-
-def khop_coverage_fraction_fast(source, k=K_HOP):
-    seen = {source}
-    frontier = {source}
+def khop_rows(rows, A, k):
+    """Reach counts for the source ids in `rows` by sparse frontier expansion."""
+    n, m = A.shape[0], len(rows)
+    R = sparse.csr_array((np.ones(m, dtype=np.float32), (np.arange(m), rows)), shape=(m, n))
+    P = R
     for _ in range(k):
-        # union of neighbors of frontier
-        nxt = set()
-        for node in frontier:
-            nxt |= adj.get(node, set())
-        nxt -= seen
-        if not nxt:
+        P = P @ A
+        P.data[:] = 1.0
+        P = P - P.multiply(R)   # keep only nodes first reached at this hop
+        P.eliminate_zeros()
+        if P.nnz == 0:
             break
-        seen |= nxt
-        frontier = nxt
-    return (len(seen) - 1) / (n_nodes - 1) if n_nodes > 1 else 0.0
-
-K = {}
-# iterate with progress bar
-for i, node in enumerate(tqdm(nodes_list, desc=f"{K_HOP}-hop")):
-    K[node] = khop_coverage_fraction_fast(node, k=K_HOP)
+        R = R + P
+    return np.diff(R.indptr) - 1
+
+def khop_block(r0, r1, A, k):
+    """Reach counts for sources r0..r1-1."""
+    return khop_rows(np.arange(r0, r1), A, k)
+
+def khop_reach_bitsets(A, k, block=256):
+    """
+    Same counts as khop_block, with each node's reached set as a row of n/64 uint64
+    words. One hop ORs together the rows of a node's neighbours
+    (bitwise_or.reduceat over CSR slices), 64 nodes per operation.
+    """
+    n = A.shape[0]
+    words = (n + 63) // 64
+    ids = np.arange(n)
+    R = np.zeros((n, words), np.uint64)
+    R[ids, ids >> 6] = np.uint64(1) << (ids & 63).astype(np.uint64)
+    deg = np.diff(A.indptr)
+    for _ in range(k):
+        nxt = R.copy()
+        for r0 in range(0, n, block):
+            r1 = min(r0 + block, n)
+            nz = np.flatnonzero(deg[r0:r1]) + r0
+            if len(nz) == 0:
+                continue
+            lo = A.indptr[r0]
+            nxt[nz] |= np.bitwise_or.reduceat(R[A.indices[lo:A.indptr[r1]]], A.indptr[nz] - lo, axis=0)
+        if np.array_equal(nxt, R):
+            break
+        R = nxt
+    if hasattr(np, "bitwise_count"):   # numpy >= 2.0
+        return np.bitwise_count(R).sum(axis=1, dtype=np.int64) - 1
+    return np.unpackbits(R.view(np.uint8), axis=1).sum(axis=1, dtype=np.int64) - 1
+
+def khop_reach_counts(A, k=K_HOP, block=2048):
+    """Number of nodes within k undirected hops of each node (itself excluded).
+
+    Uses bitsets when they fit in KHOP_BITSET_MAX_BYTES. Otherwise expands
+    sparse frontiers P <- (P @ A) minus already-reached for a block of sources
+    at a time, so R = I | A | ... | A^k never has to be held for all sources.
+    """
+    n = A.shape[0]
+    if 2 * n * ((n + 63) // 64) * 8 <= KHOP_BITSET_MAX_BYTES:
+        return khop_reach_bitsets(A, k)
+    return map_node_blocks(khop_block, A.shape[0], block, A, k).astype(np.int64)
+
+# Optional top-N filter: the per-source metrics (K, H) are only computed for the
+# highest-PageRank nodes, everything else is left at 0 and flagged as approximate.
+# E and B are global (one eigenvector / paths through every node), so they stay exact.
+cand = None
+if CANDIDATE_K and CANDIDATE_K < n_nodes:
+    pr = pagerank_csr(W)
+    cand = np.sort(np.argsort(-pr, kind="stable")[:CANDIDATE_K])
+    print(f"Computing K and H for the top {len(cand)} PageRank candidates only")
+
+reach = cache_load("khop_reach", KHOP_PARAMS)
+if reach is None:
+    if cand is not None:
+        reach = np.zeros(n_nodes, dtype=np.int64)
+        reach[cand] = np.concatenate([khop_rows(cand[i:i + 2048], A_sym, K_HOP) for i in range(0, len(cand), 2048)])
+    else:
+        reach = in_node_order(khop_reach_counts(A_loc))
+    cache_save("khop_reach", KHOP_PARAMS, reach)
+K = reach / (n_nodes - 1) if n_nodes > 1 else np.zeros(n_nodes)
 
 # --------------------------
 # 6) Homophily H (avg Jaccard over neighbors - optimized)
 # --------------------------
 print("Computing homophily (avg neighbor Jaccard on undirected neighbors)...")
-# Precompute neighbor sets (already have adj)
-H = {}
-for u in tqdm(nodes_list, desc="homophily"):
-    nbrs = adj.get(u, set())
-    if not nbrs:
-        H[u] = 0.0
-        continue
-    sim_sum = 0.0
-    cnt = 0
-    for v in nbrs:
-        Nv = adj.get(v, set())
-        union = nbrs | Nv
-        inter = nbrs & Nv
-        if len(union) == 0:
-            j = 0.0
-        else:
-            j = len(inter) / len(union)
-        sim_sum += j
-        cnt += 1
-    H[u] = (sim_sum / cnt) if cnt > 0 else 0.0
+def minhash_signatures(A, r=MINHASH_PERMS, seed=RANDOM_SEED):
+    """
+    MinHash signature of every row's neighbour set: column s is the minimum of the
+    universal hash (a_s * x + b_s) mod p over the row's column indices.
+    Rows without neighbours keep the max value.
+    """
+    p = np.uint64(2 ** 31 - 1)          # ids < p, so a * x fits in uint64
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, p, size=r, dtype=np.uint64)
+    b = rng.integers(0, p, size=r, dtype=np.uint64)
+    x = A.indices.astype(np.uint64)
+    has_nbrs = np.diff(A.indptr) > 0
+    starts = A.indptr[:-1][has_nbrs]
+    sigs = np.full((A.shape[0], r), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for s in range(r):
+        sigs[has_nbrs, s] = np.minimum.reduceat((a[s] * x + b[s]) % p, starts)
+    return sigs
+
+def minhash_neighbor_jaccard(A, r=MINHASH_PERMS, chunk=65536):
+    """avg_neighbor_jaccard with each Jaccard(N(u), N(v)) estimated as the fraction of
+    equal MinHash entries: O(r) per edge instead of O(d_u + d_v)."""
+    sigs = minhash_signatures(A, r)
+    deg = np.diff(A.indptr).astype(np.float64)
+    rows = np.repeat(np.arange(A.shape[0]), np.diff(A.indptr))
+    jac = np.empty(len(rows))
+    for i in range(0, len(rows), chunk):
+        u, v = rows[i:i + chunk], A.indices[i:i + chunk]
+        jac[i:i + chunk] = (sigs[u] == sigs[v]).mean(axis=1)
+    sums = np.bincount(rows, weights=jac, minlength=A.shape[0])
+    return np.divide(sums, deg, out=np.zeros_like(sums), where=deg > 0)
+
+H = cache_load("homophily", HOMOPHILY_PARAMS)
+if H is None:
+    if cand is not None:
+        deg_sym = np.diff(A_sym.indptr).astype(np.float64)
+        H = np.zeros(n_nodes)
+        H[cand] = np.concatenate([jaccard_rows(cand[i:i + 4096], A_sym, deg_sym) for i in range(0, len(cand), 4096)])
+        H[cand] = np.divide(H[cand], deg_sym[cand], out=np.zeros(len(cand)), where=deg_sym[cand] > 0)
+    else:
+        if use_gpu:
+            try:
+                # Jaccard for every (u, v) adjacency entry on the GPU, averaged per u on the CPU
+                S = A_sym.tocoo()
+                Gu = cugraph.Graph(directed=False)
+                Gu.from_cudf_edgelist(cudf.DataFrame({"src": S.row, "dst": S.col}), source="src",
+                                      destination="dst", renumber=False)
+                jac = cugraph.jaccard(Gu, vertex_pair=cudf.DataFrame({"first": S.row, "second": S.col})).to_pandas()
+                first = jac["first"].to_numpy()
+                deg_sym = np.bincount(first, minlength=n_nodes).astype(np.float64)
+                sums = np.bincount(first, weights=jac["jaccard_coeff"].to_numpy(), minlength=n_nodes)
+                H = np.divide(sums, deg_sym, out=np.zeros(n_nodes), where=deg_sym > 0)
+            except Exception as e:
+                print("cuGraph Jaccard failed, using CPU:", e)
+        if H is None:
+            H = in_node_order(minhash_neighbor_jaccard(A_loc) if USE_MINHASH else avg_neighbor_jaccard(A_loc, map_blocks=map_node_blocks))
+    cache_save("homophily", HOMOPHILY_PARAMS, H)
 
 # --------------------------
 # BUILD DATAFRAME (same columns as original)
@@ -217,13 +625,15 @@ for u in tqdm(nodes_list, desc="homophily"):
 print("Assembling dataframe of metrics...")
 df = pd.DataFrame({
     "node": nodes_list,
-    "E": [eigen.get(n, 0.0) for n in nodes_list],
-    "B": [bet.get(n, 0.0) for n in nodes_list],
-    "A": [closeness.get(n, 0.0) for n in nodes_list],   # placeholder activeness (may override)
-    "P": [deg.get(n, 0.0) for n in nodes_list],
-    "K": [K.get(n, 0.0) for n in nodes_list],
-    "H": [H.get(n, 0.0) for n in nodes_list],
+    "E": eigen,
+    "B": bet,
+    "A": closeness,   # placeholder activeness (may override)
+    "P": deg,
+    "K": K,
+    "H": H,
 })
+if cand is not None:
+    df["approx"] = ~np.isin(np.arange(n_nodes), cand)   # K and H not computed (left at 0)
 
 # --------------------------
 # OPTIONAL: override A with generated activeness
@@ -244,22 +654,31 @@ print(df[metrics].corr())
 # --------------------------
 # NORMALIZATION
 # --------------------------
-scaler = MinMaxScaler()
-df[[m + "_n" for m in metrics]] = scaler.fit_transform(df[metrics])
+# column-wise (x - min) / (max - min), constant columns -> 0 (what MinMaxScaler did)
+X = df[metrics].to_numpy(dtype=np.float64)
+mn, mx = X.min(axis=0), X.max(axis=0)
+df[[m + "_n" for m in metrics]] = (X - mn) / np.where(mx > mn, mx - mn, 1.0)
 
 # --------------------------
 # FORMULA (unchanged)
 # --------------------------
-df["Base"] = (
-    0.6*df["E_n"] +
-    0.3*df["B_n"] +
-    0.05*df["H_n"] +
-    0.05*df["A_n"]
-)
-
-df["Reach"] = 0.6*df["P_n"] + 0.4*df["K_n"]
-
-df["Influence_I"] = 0.7*df["Base"] + 0.3*df["Reach"]
+# Base  = 0.6 E + 0.3 B + 0.05 H + 0.05 A
+# Reach = 0.6 P + 0.4 K
+# I     = 0.7 Base + 0.3 Reach
+FORMULA_COLS = ["E_n", "B_n", "H_n", "A_n", "P_n", "K_n"]
+FORMULA_W = np.array([
+    # Base  Reach
+    [0.60,  0.0],
+    [0.30,  0.0],
+    [0.05,  0.0],
+    [0.05,  0.0],
+    [0.0,   0.6],
+    [0.0,   0.4],
+])
+base_reach = df[FORMULA_COLS].to_numpy(dtype=np.float64) @ FORMULA_W
+df["Base"] = base_reach[:, 0]
+df["Reach"] = base_reach[:, 1]
+df["Influence_I"] = base_reach @ np.array([0.7, 0.3])
 
 # --------------------------
 # SAVE OUTPUT
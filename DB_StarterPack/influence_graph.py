@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+influence_graph.py
+
+The directed influence graph built from the edges table, shared by
+influence_analysis.py and influence_by_formula.py so both read edges.csv with
+the same edge-order and weight-coercion rules.
+"""
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+
+def build_graph(edges_df):
+    """
+    Directed graph from the edge table: "friend" edges both ways, other types one way.
+    Built from column arrays instead of iterrows; edges go in the same order as a row
+    loop would add them, so node order is unchanged.
+    """
+    src = edges_df["src"].astype(str).to_numpy(dtype=object)
+    dst = edges_df["dst"].astype(str).to_numpy(dtype=object)
+    if "type" in edges_df.columns:
+        is_friend = (edges_df["type"] == "friend").to_numpy(dtype=bool)
+    else:
+        is_friend = np.ones(len(edges_df), dtype=bool)
+    if "weight" in edges_df.columns:
+        raw = edges_df["weight"]
+        w = pd.to_numeric(raw, errors="coerce")
+        w = w.where(w.notna() | raw.isna(), 1.0)   # unparsable -> 1.0, as before
+        w = w.to_numpy(dtype=float)
+    else:
+        w = np.ones(len(edges_df))
+
+    # friend rows appear twice; the second copy is the reverse edge
+    reps = 1 + is_friend
+    u, v, w = np.repeat(src, reps), np.repeat(dst, reps), np.repeat(w, reps)
+    back = np.cumsum(reps)[is_friend] - 1
+    u[back], v[back] = v[back], u[back]
+
+    G = nx.DiGraph()
+    G.add_weighted_edges_from(zip(u.tolist(), v.tolist(), w.tolist()))
+    return G
@@ -7,7 +7,8 @@ Compute k-hop coverage (number or fraction of nodes reachable within k hops) for
 Outputs: khop_results.csv with columns: node, khop_count, khop_fraction
 
 Features:
-- Uses adjacency dict for speed
+- Compiled per-source BFS over the CSR arrays (parallel over sources) when numba is installed,
+  otherwise expands all sources at once with sparse CSR products (one per hop)
 - Works with string node IDs
 - Progress bar via tqdm (optional)
 - Optionally compute only for top candidates (by degree or by pagerank) to save time
@@ -15,13 +16,22 @@ Features:
 
 import os
 import argparse
+import numpy as np
 import pandas as pd
 import networkx as nx
-from collections import deque
+from scipy import sparse
 from tqdm import tqdm
 
+from csv_engine import CSV_ENGINE
+
+try:
+    import numba   # optional: compiled, multithreaded BFS kernel
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
 def build_graph_from_edges(edges_csv, undirected=True, edge_type_col='type', keep_type='friend'):
-    df = pd.read_csv(edges_csv, dtype=str)
+    df = pd.read_csv(edges_csv, engine=CSV_ENGINE, dtype=str)
     # filter by edge type if present
     if edge_type_col in df.columns:
         df = df[df[edge_type_col].fillna(keep_type) == keep_type]
@@ -31,38 +41,90 @@ def build_graph_from_edges(edges_csv, undirected=True, edge_type_col='type', kee
         G = nx.from_pandas_edgelist(df, source='src', target='dst', create_using=nx.DiGraph())
     return G
 
-def adjacency_dict(G):
-    """Return dict node -> set(neighbors) for fast access."""
-    return {n: set(G.neighbors(n)) for n in G.nodes()}
-
-def khop_coverage_count(adj, source, k):
-    """Return number of unique nodes reachable within k hops (including source)."""
-    if k <= 0:
-        return 1
-    seen = {source}
-    frontier = {source}
-    for _ in range(k):
-        # build next frontier as union of neighbors of current frontier
-        nxt = set()
-        for u in frontier:
-            nxt |= adj.get(u, set())
-        nxt -= seen
-        if not nxt:
+def adjacency_csr(G, nodes):
+    """Binary CSR adjacency in `nodes` order (self-loops stay on the diagonal)."""
+    A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=None, dtype=np.float32, format="csr")
+    A.data[:] = 1.0
+    return A
+
+def khop_coverage_counts(A, sources, k):
+    """
+    Number of unique nodes reachable within k hops (including the source) for each
+    row index in `sources`. All sources expand together: the frontier block is
+    multiplied by A and already-seen nodes are dropped, one sparse product per hop.
+    """
+    m, n = len(sources), A.shape[0]
+    seen = sparse.csr_array((np.ones(m, dtype=np.float32), (np.arange(m), sources)), shape=(m, n))
+    frontier = seen
+    for _ in range(max(k, 0)):
+        frontier = frontier @ A
+        frontier.data[:] = 1.0
+        frontier = frontier - frontier.multiply(seen)
+        frontier.eliminate_zeros()
+        if frontier.nnz == 0:
             break
-        seen |= nxt
-        frontier = nxt
-    return len(seen)
-
-def compute_khop_for_list(adj, nodes, k, show_progress=True):
-    results = {}
-    iterator = nodes
+        seen = seen + frontier
+    return np.diff(seen.indptr)
+
+if njit is not None:
+    @njit(cache=True)
+    def _khop_bfs(indptr, indices, src, k, seen, queue):
+        """
+        Nodes within k hops of src (itself included), BFS with a bit-packed `seen`
+        set. The queue doubles as the list of touched nodes, so only their words
+        are cleared afterwards.
+        """
+        one = np.uint64(1)
+        seen[src >> 6] |= one << np.uint64(src & 63)
+        queue[0] = src
+        head, tail = 0, 1
+        for _ in range(k):
+            level_end = tail
+            while head < level_end:
+                u = queue[head]
+                head += 1
+                for e in range(indptr[u], indptr[u + 1]):
+                    v = np.int64(indices[e])
+                    bit = one << np.uint64(v & 63)
+                    if not seen[v >> 6] & bit:
+                        seen[v >> 6] |= bit
+                        queue[tail] = v
+                        tail += 1
+            if tail == level_end:
+                break
+        for j in range(tail):
+            seen[queue[j] >> 6] = 0
+        return tail
+
+    @njit(parallel=True, cache=True)
+    def khop_counts_jit(indptr, indices, sources, k, n, n_threads):
+        """
+        khop_coverage_counts as one BFS per source, sources split across numba
+        threads. Each thread owns its bitmap (n/64 words) and queue, so there
+        are no shared writes.
+        """
+        counts = np.zeros(len(sources), np.int64)
+        n_threads = min(n_threads, max(len(sources), 1))
+        per = (len(sources) + n_threads - 1) // n_threads
+        for t in prange(n_threads):
+            seen = np.zeros((n + 63) // 64, np.uint64)
+            queue = np.empty(n, np.int64)
+            for i in range(t * per, min((t + 1) * per, len(sources))):
+                counts[i] = _khop_bfs(indptr, indices, np.int64(sources[i]), k, seen, queue)
+        return counts
+
+def compute_khop_for_list(A, index, nodes, k, show_progress=True, block=2048):
+    sources = np.fromiter((index[u] for u in nodes), dtype=np.int64, count=len(nodes))
+    starts = range(0, len(nodes), block)
     if show_progress:
-        iterator = tqdm(nodes, desc=f"{k}-hop")
-    total_nodes = len(adj)
-    for u in iterator:
-        cnt = khop_coverage_count(adj, u, k)
-        results[u] = cnt
-    return results
+        starts = tqdm(starts, desc=f"{k}-hop", unit="block")
+    if njit is not None:
+        counts = [khop_counts_jit(A.indptr, A.indices, sources[b:b + block], max(k, 0), A.shape[0],
+                                  numba.get_num_threads())
+                  for b in starts]
+    else:
+        counts = [khop_coverage_counts(A, sources[b:b + block], k) for b in starts]
+    return dict(zip(nodes, np.concatenate(counts).tolist())) if counts else {}
 
 def main():
     p = argparse.ArgumentParser()
@@ -81,10 +143,11 @@ def main():
     G = build_graph_from_edges(args.edges, undirected=True)
     print("Graph loaded: nodes =", G.number_of_nodes(), "edges =", G.number_of_edges())
 
-    # adjacency dict for speed
-    adj = adjacency_dict(G)
     nodes_all = list(G.nodes())
     total_nodes = len(nodes_all)
+    # binary CSR adjacency; k-hop expansion runs as sparse products over it
+    A = adjacency_csr(G, nodes_all)
+    index = {n: i for i, n in enumerate(nodes_all)}
 
     # decide node list to compute
     if args.candidates and args.candidates > 0:
@@ -105,7 +168,7 @@ def main():
 
     show_progress = not args.no_progress
 
-    khop_counts = compute_khop_for_list(adj, node_list, args.k, show_progress=show_progress)
+    khop_counts = compute_khop_for_list(A, index, node_list, args.k, show_progress=show_progress)
 
     # prepare output rows for all nodes (fill zeros for those we skipped if using candidates mode)
     rows = []
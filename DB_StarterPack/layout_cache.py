@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+layout_cache.py
+
+Node layouts for the plotting scripts:
+- graph_layout(G) is a force-directed layout scaled to [-1, 1] like
+  nx.spring_layout, computed by compiled ForceAtlas2 or igraph's
+  Fruchterman-Reingold when installed
+- cached_layout(G, cache_dir, layout, **params) stores layout(G, **params) as
+  .npz under cache_dir, so re-runs on an unchanged graph load it
+"""
+
+import hashlib
+import os
+import random
+
+import networkx as nx
+import numpy as np
+
+try:
+    from fa2 import ForceAtlas2   # optional: compiled ForceAtlas2 layout
+except ImportError:
+    ForceAtlas2 = None
+
+try:
+    import igraph as ig   # optional: Fruchterman-Reingold layout
+except ImportError:
+    ig = None
+
+LAYOUT_BACKEND = "fa2" if ForceAtlas2 is not None else "igraph" if ig is not None else "nx"
+
+
+def graph_layout(G, seed=42, iterations=50, k=None):
+    """
+    {node: (x, y)} scaled to [-1, 1] like nx.spring_layout. nx's force loop
+    runs in Python over all node pairs, so compiled ForceAtlas2 or igraph's
+    (grid) Fruchterman-Reingold is used when installed; k (the optimal node
+    distance) only applies to the nx.spring_layout fallback.
+    """
+    nodes = list(G)
+    if not nodes:
+        return {}
+    if ForceAtlas2 is not None:
+        pos = ForceAtlas2(verbose=False).forceatlas2_networkx_layout(G, pos=None, iterations=iterations)
+        xy = np.array([pos[n] for n in nodes], dtype=float)
+    elif ig is not None:
+        idx = {n: i for i, n in enumerate(nodes)}
+        g_ig = ig.Graph(n=len(nodes), edges=[(idx[u], idx[v]) for u, v in G.edges()])
+        ig.set_random_number_generator(random.Random(seed))   # reproducible layout
+        try:
+            xy = np.array(g_ig.layout_fruchterman_reingold(niter=iterations).coords)
+        finally:
+            ig.set_random_number_generator(random)
+    else:
+        return nx.spring_layout(G, k=k, seed=seed, iterations=iterations)
+    return dict(zip(nodes, nx.rescale_layout(xy, scale=1)))
+
+
+def cached_layout(G, cache_dir, layout=graph_layout, **params):
+    """
+    layout(G, **params) stored as .npz in cache_dir, keyed by the graph (sorted
+    nodes and edges), the layout function, its params and LAYOUT_BACKEND.
+    """
+    nodes = sorted(G)
+    edges = sorted(tuple(sorted(e)) for e in G.edges())
+    tag = (layout.__name__, sorted(params.items()), LAYOUT_BACKEND)
+    key = hashlib.sha1(repr((nodes, edges, tag)).encode()).hexdigest()[:16]
+    path = os.path.join(cache_dir, f"pos_{key}.npz")
+    if os.path.exists(path):
+        return dict(zip(nodes, np.load(path)["pos"]))
+    pos = layout(G, **params)
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez(path, pos=np.array([pos[n] for n in nodes]))
+    return pos
@@ -5,15 +5,19 @@ from pyvis.network import Network
 import colorsys
 import os, webbrowser
 
+from csv_engine import CSV_ENGINE
+
 # =====================
 # 1. Load the Graph
 # =====================
 edges_path = r"C:\Users\p2123\Desktop\COLLEGE\PROJECT_3rdYear\Social_Network_Project\data\edges.csv"
-edges_df = pd.read_csv(edges_path)
+# typed read: ids as strings, "type" as category (weight stays float64)
+edges_df = pd.read_csv(edges_path, engine=CSV_ENGINE, dtype={"src": str, "dst": str, "type": "category"})
 
-G = nx.Graph()
-for _, row in edges_df.iterrows():
-    G.add_edge(row["src"], row["dst"], weight=row.get("weight", 1))
+# one bulk insert instead of a Series per row; same edge order, so same node order
+if "weight" not in edges_df.columns:
+    edges_df["weight"] = 1
+G = nx.from_pandas_edgelist(edges_df, "src", "dst", edge_attr="weight", create_using=nx.Graph())
 
 print(f"Graph loaded: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
 
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+list_fields.py
+
+The list-like columns of users.csv (languages, interests), parsed once into
+frozenset columns next to the raw strings:
+- parse_list_field(value) reads one cell
+- add_list_field_sets(users) adds the LIST_SET_COLUMNS set columns
+"""
+
+import json
+
+import pandas as pd
+
+LIST_SET_COLUMNS = {"languages": "_langs_set", "interests": "_interests_set"}
+
+
+def parse_list_field(field_value):
+    """
+    Parse a list-like CSV field: comma-separated ("hi,en", or a single "hi")
+    or JSON-style ("['a', 'b']", single quotes allowed). Missing -> [].
+    """
+    if isinstance(field_value, list):
+        return field_value
+    if not isinstance(field_value, str) or not field_value.strip():
+        return []
+    text = field_value.strip()
+    if text.startswith("["):
+        for candidate in (text, text.replace("'", '"')):
+            try:
+                parsed = json.loads(candidate)
+                return parsed if isinstance(parsed, list) else []
+            except ValueError:
+                pass
+        return []
+    return [x.strip() for x in text.split(",") if x.strip()]
+
+
+def list_field_sets(values, attr):
+    """frozenset per row of a list column (language dicts reduced to their code), each distinct value parsed once."""
+    if attr == "languages":
+        def parse(v):
+            return frozenset(l["code"] if isinstance(l, dict) else l for l in parse_list_field(v))
+    else:
+        def parse(v):
+            return frozenset(parse_list_field(v))
+    uniq = pd.unique(values)
+    return values.map(pd.Series([parse(v) for v in uniq], index=uniq, dtype=object))
+
+
+def add_list_field_sets(users):
+    """Attach the LIST_SET_COLUMNS set columns for the list columns present in users."""
+    for attr, col in LIST_SET_COLUMNS.items():
+        if attr in users:
+            users[col] = list_field_sets(users[attr], attr)
+    return users
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+louvain_backends.py
+
+Louvain on whichever compiled backend is installed, shared by the scripts that
+partition edges.csv so they agree on the result (partition_cache.py keys its
+entries on LOUVAIN_BACKEND).
+
+louvain_partition(G) returns {node: community}: networkit's parallel PLM, else
+igraph's C multilevel Louvain on its own seeded RNG, else louvain_fast.
+
+community_partition(G) is the chain the community reports use: cugraph on
+the GPU when asked for, else igraph, networkx's built-in Louvain or
+python-louvain (Leiden instead of Louvain where the backend has it, when asked
+for), returning the partition with its modularity and the method used.
+"""
+
+import random
+
+import networkx as nx
+
+from louvain_fast import best_partition_fast
+
+try:
+    import igraph as ig   # optional: C multilevel Louvain and Leiden
+except ImportError:
+    ig = None
+
+try:
+    from graspologic.partition import leiden as graspologic_leiden   # optional: native Leiden
+except ImportError:
+    graspologic_leiden = None
+
+try:
+    import networkit as nk   # optional: parallel Louvain (PLM)
+except ImportError:
+    nk = None
+
+try:
+    import community as community_louvain   # optional: python-louvain
+except ImportError:
+    community_louvain = None
+
+try:
+    from networkx.algorithms.community import louvain_communities   # networkx >= 2.8
+except ImportError:
+    louvain_communities = None
+
+LOUVAIN_SEED = 42
+LOUVAIN_BACKEND = "networkit" if nk is not None else "igraph" if ig is not None else "louvain_fast"
+
+
+def to_networkit(G):
+    """networkit copy of G on contiguous int ids; returns (graph, node list)."""
+    nodes = list(G)
+    idx = {n: i for i, n in enumerate(nodes)}
+    Gk = nk.Graph(len(nodes), weighted=True)
+    for u, v, w in G.edges(data="weight", default=1.0):
+        Gk.addEdge(idx[u], idx[v], w)
+    return Gk, nodes
+
+
+def igraph_multilevel(G, weight="weight", seed=None, leiden=False):
+    """
+    (node list, igraph VertexClustering) for G: multilevel Louvain, or with
+    leiden=True modularity Leiden run until it stops improving. With a seed,
+    igraph draws from its own random.Random(seed): reproducible, and the global
+    `random` stream is left alone.
+    """
+    nodes = list(G)
+    idx = {n: i for i, n in enumerate(nodes)}
+    g_ig = ig.Graph(n=len(nodes), edges=[(idx[u], idx[v]) for u, v in G.edges()])
+    weights = [w for _, _, w in G.edges(data=weight, default=1.0)] if weight is not None else None
+    if leiden:
+        def run():
+            return g_ig.community_leiden(objective_function="modularity", weights=weights, n_iterations=-1)
+    else:
+        def run():
+            return g_ig.community_multilevel(weights=weights)
+    if seed is None:
+        return nodes, run()
+    ig.set_random_number_generator(random.Random(seed))
+    try:
+        return nodes, run()
+    finally:
+        ig.set_random_number_generator(random)
+
+
+def louvain_partition(G, seed=LOUVAIN_SEED):
+    """
+    {node: community} by Louvain: networkit's parallel PLM or igraph's C
+    multilevel when installed, else louvain_fast (incremental modularity gains).
+    """
+    if nk is not None:
+        Gk, nodes = to_networkit(G)
+        algo = nk.community.PLM(Gk, refine=True)
+        algo.run()
+        return dict(zip(nodes, algo.getPartition().getVector()))
+    if ig is not None:
+        nodes, clustering = igraph_multilevel(G, seed=seed)
+        return dict(zip(nodes, clustering.membership))
+    return best_partition_fast(G)
+
+
+def community_partition(G, use_gpu=False, weight="weight", seed=None, leiden=False):
+    """
+    (partition, modularity, method) by Louvain, or by Leiden with leiden=True
+    where the backend has it; (None, None, None) when no implementation is
+    available. With use_gpu, runs on the GPU through cugraph (NetworkX graph in,
+    dict partition out). On CPU, igraph's C implementation reports modularity
+    with the partition, so no second pass over the edges; then (for Leiden)
+    graspologic, then networkx's built-in Louvain, then python-louvain. `seed`
+    fixes the CPU runs.
+    """
+    if use_gpu:
+        try:
+            import cugraph
+            run = cugraph.leiden if leiden else cugraph.louvain
+            parts, modularity = run(G)   # reads the "weight" edge attribute itself
+            if hasattr(parts, "to_pandas"):   # cuDF frame (vertex, partition)
+                parts = parts.to_pandas()
+                parts = dict(zip(parts["vertex"].tolist(), parts["partition"].tolist()))
+            partition = {n: int(c) for n, c in parts.items()}
+            return partition, float(modularity), ("Leiden" if leiden else "Louvain") + " (cugraph)"
+        except ImportError:
+            print("cugraph not available; running on CPU.")
+        except Exception as e:   # e.g. no GPU or CUDA runtime
+            print(f"cugraph failed ({e}); running on CPU.")
+    if ig is not None:
+        nodes, clustering = igraph_multilevel(G, weight=weight, seed=seed, leiden=leiden)
+        method = ("Leiden" if leiden else "Louvain") + " (igraph)"
+        return dict(zip(nodes, clustering.membership)), clustering.modularity, method
+    if leiden and graspologic_leiden is not None:
+        partition = graspologic_leiden(G, random_seed=seed, weight_attribute=weight)
+        comms = {}
+        for n, c in partition.items():
+            comms.setdefault(c, set()).add(n)
+        return partition, nx.community.modularity(G, comms.values(), weight=weight), "Leiden (graspologic)"
+    if louvain_communities is not None:
+        comms = louvain_communities(G, weight=weight, seed=seed)
+        comm_of = {n: cid for cid, comm in enumerate(comms) for n in comm}
+        partition = {n: comm_of[n] for n in G}   # keep node order for the CSVs
+        return partition, nx.community.modularity(G, comms, weight=weight), "Louvain (networkx)"
+    if community_louvain is not None:
+        partition = community_louvain.best_partition(G, weight=weight, random_state=seed)
+        return partition, community_louvain.modularity(partition, G, weight=weight), "Louvain (python-louvain)"
+    return None, None, None
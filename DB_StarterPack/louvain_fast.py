@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+louvain_fast.py
+
+Louvain community detection (modularity, resolution 1) on CSR arrays.
+
+best_partition_fast(G) returns {node: community id} like
+community_louvain.best_partition, without the python-louvain dependency:
+- node moves use the closed-form gain k_i_in(c) - sum_tot[c] * k_i / 2m, with
+  sum_tot kept up to date on every move (no modularity recomputation)
+- weighted degrees are computed once per level; they do not change while nodes move
+- each level is contracted into the next with one sparse product
+- the local-moving sweep is a compiled kernel when numba is installed
+"""
+
+import numpy as np
+import networkx as nx
+from scipy import sparse
+
+try:
+    from numba import njit   # optional: compiled local-moving sweep
+except ImportError:
+    njit = None
+
+
+def graph_to_csr(G, weight="weight"):
+    """
+    (nodes, A, deg): symmetric weighted adjacency without the diagonal, and
+    weighted degrees with self-loops counted twice (as G.degree(weight=...)).
+    """
+    if G.is_directed():
+        raise TypeError("Louvain needs an undirected graph")
+    nodes = list(G)
+    A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=weight, dtype=np.float64, format="csr")
+    loops = A.diagonal()
+    deg = np.asarray(A.sum(axis=1)).ravel() + loops
+    A.setdiag(0)
+    A.eliminate_zeros()
+    return nodes, A, deg
+
+
+def louvain_pass(indptr, nbrs, w, deg, node_comm, sum_tot, m2, order):
+    """
+    One sweep over `order`: each node moves to the neighbouring community with
+    the largest modularity gain (staying put on ties). Updates node_comm and
+    sum_tot in place and returns the number of moves.
+    """
+    moves = 0
+    for i in order:
+        k_i = deg[i]
+        old = node_comm[i]
+        # edge weight from i to each neighbouring community, i itself excluded
+        k_in = {}
+        for p in range(indptr[i], indptr[i + 1]):
+            c = node_comm[nbrs[p]]
+            k_in[c] = k_in.get(c, 0.0) + w[p]
+        sum_tot[old] -= k_i
+        best, best_gain = old, k_in.get(old, 0.0) - sum_tot[old] * k_i / m2
+        for c, kc in k_in.items():
+            gain = kc - sum_tot[c] * k_i / m2
+            if gain > best_gain:
+                best, best_gain = c, gain
+        sum_tot[best] += k_i
+        if best != old:
+            node_comm[i] = best
+            moves += 1
+    return moves
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _louvain_pass(indptr, nbrs, w, deg, node_comm, sum_tot, m2, order, cand_w, cand, seen, stamp):
+        """
+        louvain_pass on arrays. cand_w / cand / seen are scratch indexed by
+        community id: seen[c] == stamp marks cand_w[c] as valid for the current
+        node, so nothing is cleared between nodes. Returns (moves, last stamp).
+        """
+        moves = 0
+        for i in order:
+            stamp += 1
+            k_i = deg[i]
+            old = node_comm[i]
+            n_cand = 0
+            for p in range(indptr[i], indptr[i + 1]):
+                c = node_comm[nbrs[p]]
+                if seen[c] != stamp:
+                    seen[c] = stamp
+                    cand_w[c] = 0.0
+                    cand[n_cand] = c
+                    n_cand += 1
+                cand_w[c] += w[p]
+            sum_tot[old] -= k_i
+            k_old = cand_w[old] if seen[old] == stamp else 0.0
+            best, best_gain = old, k_old - sum_tot[old] * k_i / m2
+            for j in range(n_cand):
+                c = cand[j]
+                gain = cand_w[c] - sum_tot[c] * k_i / m2
+                if gain > best_gain:
+                    best, best_gain = c, gain
+            sum_tot[best] += k_i
+            if best != old:
+                node_comm[i] = best
+                moves += 1
+        return moves, stamp
+
+
+def one_level(A, deg, m2, order, max_passes):
+    """Local moving on one level; returns each node's community, renumbered 0..C-1."""
+    if njit is not None:
+        n = A.shape[0]
+        node_comm = np.arange(n, dtype=np.int64)
+        sum_tot = deg.astype(np.float64)
+        cand_w, cand, seen = np.zeros(n), np.empty(n, dtype=np.int64), np.zeros(n, dtype=np.int64)
+        stamp = 0
+        for _ in range(max_passes):
+            moves, stamp = _louvain_pass(A.indptr, A.indices, A.data, deg, node_comm, sum_tot, m2,
+                                         order, cand_w, cand, seen, stamp)
+            if moves == 0:
+                break
+        return np.unique(node_comm, return_inverse=True)[1]
+    indptr, nbrs, w = A.indptr.tolist(), A.indices.tolist(), A.data.tolist()
+    deg_list, order_list = deg.tolist(), order.tolist()
+    node_comm = list(range(A.shape[0]))
+    sum_tot = list(deg_list)
+    for _ in range(max_passes):
+        if louvain_pass(indptr, nbrs, w, deg_list, node_comm, sum_tot, m2, order_list) == 0:
+            break
+    return np.unique(np.asarray(node_comm), return_inverse=True)[1]
+
+
+def aggregate(A, deg, comm):
+    """Contract communities into nodes: summed edge weights between them and summed degrees."""
+    n_comm = int(comm.max()) + 1
+    P = sparse.csr_array((np.ones(len(comm)), (np.arange(len(comm)), comm)), shape=(len(comm), n_comm))
+    B = (P.T @ A @ P).tocsr()
+    B.setdiag(0)
+    B.eliminate_zeros()
+    return B, np.bincount(comm, weights=deg, minlength=n_comm)
+
+
+def best_partition_fast(G, weight="weight", random_state=None, max_levels=50, max_passes=100):
+    """
+    {node: community id} maximising modularity with Louvain. Nodes are visited in
+    graph order, or in a random order per level when random_state is given.
+    """
+    nodes, A, deg = graph_to_csr(G, weight)
+    if len(nodes) == 0:
+        return {}
+    m2 = float(deg.sum())
+    if m2 == 0:
+        return {n: i for i, n in enumerate(nodes)}
+    rng = np.random.default_rng(random_state) if random_state is not None else None
+
+    labels = np.arange(len(nodes))   # community of each original node at the current level
+    for _ in range(max_levels):
+        n = A.shape[0]
+        order = rng.permutation(n) if rng is not None else np.arange(n)
+        comm = one_level(A, deg, m2, order, max_passes)
+        if comm.max() + 1 == n:   # no node moved: the partition is final
+            break
+        labels = comm[labels]
+        A, deg = aggregate(A, deg, comm)
+
+    # number communities by first appearance in node order, as python-louvain does
+    _, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first, kind="stable")] = np.arange(len(first))
+    return dict(zip(nodes, rank[inverse].tolist()))
@@ -3,41 +3,42 @@
 
 import pandas as pd
 import networkx as nx
-import ast
+import os
+from itertools import islice
+import numpy as np
 import matplotlib.pyplot as plt
+from scipy import sparse
+
+from csv_engine import CSV_ENGINE
+from layout_cache import cached_layout
+from list_fields import LIST_SET_COLUMNS, add_list_field_sets, list_field_sets
+from louvain_backends import community_partition
+from pagerank_csr import graph_csr, pagerank
 
 try:
-    import community as community_louvain
+    from numba import njit, prange   # optional: compiled label-propagation sweep
 except ImportError:
-    community_louvain = None
+    njit = None
 
-# ----------------------------
-# Utility: Parse field
-# ----------------------------
-def parse_list_field(field_value):
-    """Safely parse list-like string fields from CSV."""
-    try:
-        if pd.isna(field_value) or field_value == "":
-            return []
+OUT_DIR = r"C:\Users\p2123\Desktop\COLLEGE\PROJECT_3rdYear\Social_Network_Project\data"
 
-        # If already list
-        if isinstance(field_value, list):
-            return field_value
 
-        # If comma-separated string: turn into list
-        if isinstance(field_value, str) and "," in field_value:
-            return [x.strip() for x in field_value.split(",") if x.strip()]
-
-        # Otherwise try literal_eval (for formats like "['a','b']")
-        return ast.literal_eval(field_value)
-
-    except:
-        return []
+def save_table(df, name):
+    """
+    Write a result table to OUT_DIR as snappy Parquet (binary columns, no
+    float -> text formatting). Returns the file name.
+    """
+    fname = f"{name}.parquet"
+    df.to_parquet(os.path.join(OUT_DIR, fname), engine="pyarrow", compression="snappy", index=False)
+    return fname
 
 # ----------------------------
 # Load CSV data
 # ----------------------------
-edges = pd.read_csv("../data/edges.csv")
+# only the columns used; ids come in as strings and the edge type as a category,
+# so the friend filter compares small integer codes
+edges = pd.read_csv("../data/edges.csv", engine=CSV_ENGINE, usecols=["src", "dst", "type", "weight"],
+                    dtype={"src": str, "dst": str, "type": "category"})
 users = pd.read_csv("../data/users.csv")
 
 # IMPORTANT FIX: Ensure IDs are strings
@@ -45,32 +46,57 @@ edges["src"] = edges["src"].astype(str)
 edges["dst"] = edges["dst"].astype(str)
 users["_id"] = users["_id"].astype(str)
 
+# Parsed list fields, stored once as frozenset columns next to the raw strings;
+# everything below reads these instead of parsing again.
+add_list_field_sets(users)
+
+# One O(1) lookup per user instead of a users["_id"] == uid scan per lookup.
+# First row wins for duplicate ids, as .values[0] did.
+first_rows = users.drop_duplicates("_id")
+name_by_id = dict(zip(first_rows["_id"], first_rows["name"]))
+city_by_id = dict(zip(first_rows["_id"], first_rows["city"].astype(str)))
+langs_by_id = dict(zip(first_rows["_id"], first_rows["_langs_set"]))
+interests_by_id = dict(zip(first_rows["_id"], first_rows["_interests_set"]))
+
 # ----------------------------
 # Build undirected friend graph
 # ----------------------------
 friend_edges = edges[edges["type"] == "friend"][["src", "dst", "weight"]]
 
-G = nx.Graph()
-for _, row in friend_edges.iterrows():
-    try:
-        w = float(row.get("weight", 1.0))
-    except:
-        w = 1.0
-    G.add_edge(row["src"], row["dst"], weight=w)
+# bulk insert instead of iterrows; unparsable weights -> 1.0 as before (missing stays NaN)
+raw_w = friend_edges["weight"]
+w = pd.to_numeric(raw_w, errors="coerce")
+friend_edges = friend_edges.assign(weight=w.where(w.notna() | raw_w.isna(), 1.0))
+G = nx.from_pandas_edgelist(friend_edges, source="src", target="dst", edge_attr="weight", create_using=nx.Graph)
 
 print("Nodes:", G.number_of_nodes(), "Edges:", G.number_of_edges())
 
 # ----------------------------
 # SubGraph selection
 # ----------------------------
+def explode_list_field(users, attr):
+    """Long (_id, item) table of a list column: one row per list element."""
+    col = LIST_SET_COLUMNS[attr]
+    sets = users[col] if col in users else list_field_sets(users[attr], attr)
+    return pd.DataFrame({"_id": users["_id"], attr: sets}).explode(attr)
+
+
+# built once for the loaded users; filters on them become one isin per attribute
+list_long_users = users
+list_long = {attr: explode_list_field(users, attr) for attr in LIST_SET_COLUMNS}
+
+
 def multi_attribute_subgraph(G, users, **kwargs):
     selected_ids = set(users["_id"])
     for attr, val in kwargs.items():
         if val is not None:
-            if attr in ["languages", "interests"]:
-                matched = users[users[attr].apply(
-                    lambda x: bool(set(val) & set(parse_list_field(x)))
-                )]["_id"]
+            if attr in LIST_SET_COLUMNS:
+                # any other frame (e.g. a filtered copy) is exploded on the spot
+                if users is list_long_users:
+                    long = list_long[attr]
+                else:
+                    long = explode_list_field(users, attr)
+                matched = long.loc[long[attr].isin(set(val)), "_id"].unique()
             elif isinstance(val, (list, set, range)):
                 matched = users[users[attr].isin(val)]["_id"]
             else:
@@ -81,96 +107,160 @@ def multi_attribute_subgraph(G, users, **kwargs):
 # ----------------------------
 # PageRank
 # ----------------------------
-pr = nx.pagerank(G, weight="weight")
+pr = pagerank(G, weight="weight")
 pr_top = sorted(pr.items(), key=lambda x: x[1], reverse=True)[:10]
 
 print("\nTop 10 PageRank nodes:")
 for node, score in pr_top:
-    name_row = users.loc[users["_id"] == node, "name"]
-    name = name_row.values[0] if not name_row.empty else "Unknown"
-    print(f"{node} ({name}) -> {score:.5f}")
+    print(f"{node} ({name_by_id.get(node, 'Unknown')}) -> {score:.5f}")
 
 # Save PageRank
-pr_df = pd.DataFrame(
-    [(uid,
-      users.loc[users["_id"] == uid, "name"].values[0] if not users.loc[users["_id"] == uid].empty else "Unknown",
-      score)
-     for uid, score in pr.items()],
-    columns=["_id", "name", "pagerank"]
-)
-pr_df.to_csv(r"C:\Users\p2123\Desktop\COLLEGE\PROJECT_3rdYear\Social_Network_Project\data\pagerank.csv", index=False)
+pr_df = pd.DataFrame({
+    "_id": list(pr),
+    "name": [name_by_id.get(uid, "Unknown") for uid in pr],
+    "pagerank": list(pr.values()),
+})
+print("Wrote", save_table(pr_df, "pagerank"))
+# highlight_nodes_visualization.py reads the CSV copy
+pr_df.to_csv(os.path.join(OUT_DIR, "pagerank.csv"), index=False)
 print("Wrote pagerank.csv")
 
 # ----------------------------
 # Community detection
 # ----------------------------
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _lpa_sweep(indptr, indices, labels, order, bounds):
+        """
+        One semi-synchronous label propagation pass: colour classes in turn,
+        nodes of a class in parallel (they share no edge, so updating labels in
+        place is race-free). A node keeps its label while it is among the most
+        frequent neighbour labels, else takes the smallest most frequent one.
+        Returns the number of nodes that changed label.
+        """
+        changed = 0
+        for c in range(len(bounds) - 1):
+            flags = np.zeros(bounds[c + 1] - bounds[c], dtype=np.int64)
+            for t in prange(bounds[c], bounds[c + 1]):
+                v = order[t]
+                if indptr[v] == indptr[v + 1]:
+                    continue
+                nb = np.sort(labels[indices[indptr[v]:indptr[v + 1]]])
+                cur = labels[v]
+                best, best_label, keep = 0, -1, False
+                i = 0
+                while i < len(nb):
+                    j = i
+                    while j < len(nb) and nb[j] == nb[i]:
+                        j += 1
+                    if j - i > best:
+                        best, best_label, keep = j - i, nb[i], nb[i] == cur
+                    elif j - i == best and nb[i] == cur:
+                        keep = True
+                    i = j
+                if not keep:
+                    labels[v] = best_label
+                    flags[t - bounds[c]] = 1
+            changed += flags.sum()
+        return changed
+
+
+def label_propagation(G, max_iter=100):
+    """
+    Communities (list of node sets) by the semi-synchronous label propagation of
+    nx.label_propagation_communities, run as a compiled kernel when numba is
+    installed. Ties go to the smallest label instead of a random pick.
+    """
+    if njit is None or len(G) == 0:
+        return list(nx.algorithms.community.label_propagation_communities(G))
+    nodes = list(G)
+    A = graph_csr(G, nodes, weight=None)
+    colour = nx.greedy_color(G)
+    colours = np.array([colour[u] for u in nodes])
+    order = np.argsort(colours, kind="stable")
+    bounds = np.searchsorted(colours[order], np.arange(colours.max() + 2))
+    labels = np.arange(len(nodes))
+    for _ in range(max_iter):
+        if _lpa_sweep(A.indptr, A.indices, labels, order, bounds) == 0:
+            break
+    groups = {}
+    for u, lab in zip(nodes, labels.tolist()):
+        groups.setdefault(lab, set()).add(u)
+    return list(groups.values())
+
+
 comm_df = None
-if community_louvain:
-    partition = community_louvain.best_partition(G, weight="weight")
+partition, _, comm_method = community_partition(G, use_gpu=True, seed=42, leiden=True)
+if partition is not None:
     communities_set = set(partition.values())
-    print(f"\nLouvain communities found: {len(communities_set)}")
-
-    comm_df = pd.DataFrame(
-        [(uid,
-          users.loc[users["_id"] == uid, "name"].values[0] if not users.loc[users["_id"] == uid].empty else "Unknown",
-          comm)
-         for uid, comm in partition.items()],
-        columns=["_id", "name", "louvain_comm"]
-    )
-    comm_df.to_csv(r"C:\Users\p2123\Desktop\COLLEGE\PROJECT_3rdYear\Social_Network_Project\data\communities.csv", index=False)
-    print("Wrote communities.csv")
+    print(f"\n{comm_method} communities found: {len(communities_set)}")
+
+    comm_df = pd.DataFrame({
+        "_id": list(partition),
+        "name": [name_by_id.get(uid, "Unknown") for uid in partition],
+        "community": list(partition.values()),
+    })
+    print("Wrote", save_table(comm_df, "communities"))
 else:
-    communities_list = list(nx.algorithms.community.label_propagation_communities(G))
+    communities_list = label_propagation(G)
     print(f"\nLabel Propagation communities found: {len(communities_list)}")
 
 # ----------------------------
 # Friend recommendation
 # ----------------------------
+def one_hot(item_sets):
+    """Binary node x item CSR matrix from one set of items per node."""
+    lengths = np.fromiter((len(x) for x in item_sets), dtype=np.int64, count=len(item_sets))
+    codes, _ = pd.factorize(pd.Series([i for x in item_sets for i in x], dtype=object))
+    indptr = np.zeros(len(item_sets) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    n_items = int(codes.max()) + 1 if len(codes) else 0
+    return sparse.csr_array((np.ones(len(codes)), codes, indptr), shape=(len(item_sets), n_items))
+
+
+# Per-node features, built once, side by side in one CSR matrix:
+# [city one-hot | languages | interests | adjacency]. F @ F[user] then gives
+# city match + shared languages + shared interests + common neighbours for
+# every node in a single sparse product.
+rec_nodes = list(G)
+rec_index = {u: i for i, u in enumerate(rec_nodes)}
+rec_known = np.array([u in name_by_id for u in rec_nodes], dtype=bool)
+rec_adj = graph_csr(G, rec_nodes, weight=None)   # binary: weight=None reads every entry as 1
+rec_features = sparse.hstack([
+    one_hot([{city_by_id[u]} if u in city_by_id else () for u in rec_nodes]),
+    one_hot([langs_by_id.get(u, frozenset()) for u in rec_nodes]),
+    one_hot([interests_by_id.get(u, frozenset()) for u in rec_nodes]),
+    rec_adj,
+], format="csr")
+
+
 def recommend_friends(user_id, top_k=5):
     if user_id not in G:
         return []
 
-    current_friends = set(G.neighbors(user_id))
-    candidates = set(G.nodes()) - current_friends - {user_id}
-
-    user_row = users[users["_id"] == user_id]
-    if user_row.empty:
+    if user_id not in name_by_id:
         return []
 
-    user_langs = set(parse_list_field(user_row["languages"].values[0]))
-    user_city = str(user_row["city"].values[0])
-    user_interests = set(parse_list_field(user_row["interests"].values[0]))
+    i = rec_index[user_id]
+    # city match + shared languages + shared interests + common neighbours
+    score = (rec_features @ rec_features[[i]].toarray().ravel()).astype(np.int64)
 
-    scored = []
-    for cand in candidates:
-        cand_row = users[users["_id"] == cand]
-        if cand_row.empty:
-            continue
-        score = 0
-        if str(cand_row["city"].values[0]) == user_city:
-            score += 1
+    # candidates: known users that are neither the user nor already friends
+    ok = rec_known & (score > 0)
+    ok[i] = False
+    ok[rec_adj.indices[rec_adj.indptr[i]:rec_adj.indptr[i + 1]]] = False
 
-        cand_langs = set(parse_list_field(cand_row["languages"].values[0]))
-        score += len(user_langs & cand_langs)
-
-        cand_interests = set(parse_list_field(cand_row["interests"].values[0]))
-        score += len(user_interests & cand_interests)
-
-        common_neighbors = len(set(nx.common_neighbors(G, user_id, cand)))
-        score += common_neighbors
-
-        if score > 0:
-            scored.append((cand, score))
-
-    scored.sort(key=lambda x: x[1], reverse=True)
-    return scored[:top_k]
+    cand = np.flatnonzero(ok)
+    top = cand[np.argsort(-score[cand], kind="stable")[:top_k]]
+    return [(rec_nodes[j], int(score[j])) for j in top]
 
 example_user = pr_top[0][0]
 print(f"\nFriend recommendations for {example_user}:")
 for cand, score in recommend_friends(example_user, top_k=5):
-    name_row = users.loc[users["_id"] == cand, "name"]
-    name = name_row.values[0] if not name_row.empty else "Unknown"
-    print(f"  {cand} ({name}) score={score}")
+    print(f"  {cand} ({name_by_id.get(cand, 'Unknown')}) score={score}")
+
+LAYOUT_CACHE_DIR = os.path.join("..", "data", ".cache", "layouts")
+
 
 # ----------------------------
 # Visualization (Optimized for performance)
@@ -182,11 +272,15 @@ if comm_df is not None:
     top_nodes = pr_df.sort_values("pagerank", ascending=False)["_id"].head(300).tolist()
     sub_nodes = set(top_nodes)
 
+    # set.update over islice chunks: each chunk is at most the room left, so the
+    # cap is never overshot; repeats among the neighbours just pull another chunk
     for n in top_nodes:
-        for nbr in G.neighbors(n):
-            if len(sub_nodes) >= 800:
+        nbrs = iter(G._adj[n])
+        while len(sub_nodes) < 800:
+            chunk = list(islice(nbrs, 800 - len(sub_nodes)))
+            if not chunk:
                 break
-            sub_nodes.add(nbr)
+            sub_nodes.update(chunk)
         if len(sub_nodes) >= 800:
             break
 
@@ -195,11 +289,11 @@ if comm_df is not None:
     print("Subgraph created → nodes:", SG.number_of_nodes(), "edges:", SG.number_of_edges())
     print("Drawing visualization...")
 
-    # Fast spring layout on the small graph
-    pos = nx.spring_layout(SG, k=0.5, iterations=60, seed=42)
+    # Force-directed layout of the small graph (compiled when available, cached on disk)
+    pos = cached_layout(SG, LAYOUT_CACHE_DIR, seed=42, iterations=60, k=0.5)
 
     # Build color and size maps
-    comm_map = dict(zip(comm_df["_id"], comm_df["louvain_comm"]))
+    comm_map = dict(zip(comm_df["_id"], comm_df["community"]))
     pr_map = dict(zip(pr_df["_id"], pr_df["pagerank"]))
     communities = list(set(comm_map.values()))
     color_map = {c: plt.cm.tab20(i % 20) for i, c in enumerate(communities)}
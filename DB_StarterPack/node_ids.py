@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+node_ids.py
+
+Node ids for graphs read from edge CSVs: str(int(x)), falling back to str(x)
+when x is not an integer, worked out once per distinct value rather than once
+per row. Used by the loaders in community_summary_no_khop.py and
+visualize_top200_with_top10.py.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def node_id_columns(col):
+    """(converts, str(int(x)), str(x)) arrays for a column."""
+    if pd.api.types.is_integer_dtype(col):
+        ids = col.astype(str).to_numpy(dtype=object)
+        return np.ones(len(col), dtype=bool), ids, ids
+    codes, uniques = pd.factorize(col, use_na_sentinel=False)
+    ok, as_int, raw = [], [], []
+    for x in uniques:
+        try:
+            as_int.append(str(int(x))); ok.append(True)
+        except Exception:
+            as_int.append(None); ok.append(False)
+        raw.append(str(x))
+    return (np.array(ok, dtype=bool)[codes], np.array(as_int, dtype=object)[codes],
+            np.array(raw, dtype=object)[codes])
+
+
+def edge_id_columns(src, dst):
+    """
+    (u, v) id arrays for two endpoint columns. As in the per-row loop
+        try: u = str(int(u)); v = str(int(v))
+        except Exception: u = str(u); v = str(v)
+    the target keeps str(x) whenever either end fails, the source only when it fails.
+    """
+    u_ok, u_int, u_raw = node_id_columns(src)
+    v_ok, v_int, v_raw = node_id_columns(dst)
+    return np.where(u_ok, u_int, u_raw), np.where(u_ok & v_ok, v_int, v_raw)
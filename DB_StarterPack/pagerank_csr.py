@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+pagerank_csr.py
+
+nx.pagerank's model (uniform teleport, dangling rank spread uniformly, stop
+when the L1 change drops below n * tol) as power iteration on a CSR matrix,
+shared by the scripts that rank nodes:
+- pagerank_csr(W) ranks the rows of a prebuilt weighted adjacency (row u holds
+  u's out-edges) and returns an array
+- pagerank(G) builds that adjacency from G and returns {node: rank}
+The iteration is a compiled kernel when numba is installed, else SciPy SpMV.
+"""
+
+import numpy as np
+import networkx as nx
+from scipy import sparse
+
+try:
+    from numba import njit, prange   # optional: compiled PageRank iteration
+except ImportError:
+    njit = None
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _pagerank_iter(indptr, indices, data, dangling, alpha, tol, max_iter):
+        """
+        Power iteration on the column-stochastic CSR matrix (row v holds the
+        shares flowing into v). Returns the ranks and the iterations used;
+        max_iter + 1 means no convergence.
+        """
+        n = len(indptr) - 1
+        r = np.full(n, 1.0 / n)
+        out = np.empty(n)
+        for it in range(max_iter):
+            # dangling nodes spread their rank uniformly, as in nx.pagerank
+            leak = 0.0
+            for u in range(n):
+                if dangling[u]:
+                    leak += r[u]
+            base = alpha * leak / n + (1.0 - alpha) / n
+            for v in prange(n):
+                s = 0.0
+                for k in range(indptr[v], indptr[v + 1]):
+                    s += data[k] * r[indices[k]]
+                out[v] = alpha * s + base
+            err = 0.0
+            for v in range(n):
+                err += abs(out[v] - r[v])
+            r, out = out, r
+            if err < n * tol:
+                return r, it + 1
+        return r, max_iter + 1
+
+
+def graph_csr(G, nodes, weight="weight"):
+    """
+    Weighted adjacency (out-edges per row) in `nodes` order, read straight from
+    the adjacency dicts; missing weights count as 1 like nx.to_scipy_sparse_array,
+    and weight=None reads every entry as 1.
+    """
+    index = {u: i for i, u in enumerate(nodes)}
+    adj = G._adj
+    n = len(nodes)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.fromiter((len(adj[u]) for u in nodes), dtype=np.int64, count=n), out=indptr[1:])
+    nnz = int(indptr[-1])
+    indices = np.fromiter((index[v] for u in nodes for v in adj[u]), dtype=np.int64, count=nnz)
+    data = np.fromiter((d.get(weight, 1) for u in nodes for d in adj[u].values()), dtype=float, count=nnz)
+    return sparse.csr_array((data, indices, indptr), shape=(n, n))
+
+
+def pagerank_csr(W, alpha=0.85, tol=1e-6, max_iter=100):
+    """PageRank of the rows of W (row u = u's weighted out-edges), as an array."""
+    n = W.shape[0]
+    out_w = np.asarray(W.sum(axis=1), dtype=float).ravel()
+    dangling = out_w == 0
+    inv_out = np.divide(1.0, out_w, out=np.zeros_like(out_w), where=~dangling)
+    M = (W.multiply(inv_out[:, None])).T.tocsr()   # M[v, u] = share of u's rank sent to v
+    if njit is not None:
+        r, iters = _pagerank_iter(M.indptr, M.indices, M.data.astype(float), dangling, alpha, tol, max_iter)
+        if iters > max_iter:
+            raise nx.PowerIterationFailedConvergence(max_iter)
+        return r
+    r = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        r_last = r
+        r = alpha * (M @ r_last + r_last[dangling].sum() / n) + (1 - alpha) / n
+        if np.abs(r - r_last).sum() < n * tol:
+            return r
+    raise nx.PowerIterationFailedConvergence(max_iter)
+
+
+def pagerank(G, alpha=0.85, tol=1e-6, max_iter=100, weight="weight"):
+    """{node: rank} like nx.pagerank(G, alpha, weight=weight), via pagerank_csr."""
+    if len(G) == 0:
+        return {}
+    nodes = list(G)
+    return dict(zip(nodes, pagerank_csr(graph_csr(G, nodes, weight), alpha, tol, max_iter).tolist()))
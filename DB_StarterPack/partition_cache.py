@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+partition_cache.py
+
+Full-graph Louvain partitions stored next to the edges file, so that
+select_leader_deputy.py and visualize_top200_with_top10.py run Louvain on the
+same edges.csv once between them.
+
+cached_partition(G, edges_path, detect, backend) returns detect(G), loading it
+from <edges dir>/.cache/ when an entry exists for the same file size, mtime and
+Louvain backend. Node ids are stored as strings, so a graph with int nodes and
+one with str nodes built from the same file share the entry.
+"""
+
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (optional: Parquet cache files)
+    CACHE_FORMAT = "parquet"
+except ImportError:
+    CACHE_FORMAT = "csv"
+
+
+def partition_cache_path(edges_path, backend):
+    st = os.stat(edges_path)
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(edges_path)), ".cache")
+    return os.path.join(cache_dir, f"partition_{backend}_{st.st_size}_{st.st_mtime_ns}.{CACHE_FORMAT}")
+
+
+def cached_partition(G, edges_path, detect, backend):
+    """{node: community} for G, from the cache or from detect(G) (then stored)."""
+    path = partition_cache_path(edges_path, backend)
+    if os.path.exists(path):
+        if CACHE_FORMAT == "parquet":
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_csv(path, dtype={"node": str})
+        comm = dict(zip(df["node"], df["community"].tolist()))
+        # use the entry only if it covers exactly this graph's nodes
+        if len(comm) == G.number_of_nodes() and all(str(n) in comm for n in G):
+            return {n: comm[str(n)] for n in G}
+
+    partition = detect(G)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df = pd.DataFrame({"node": [str(n) for n in partition], "community": list(partition.values())})
+    if CACHE_FORMAT == "parquet":
+        df.to_parquet(path, engine="pyarrow", index=False)
+    else:
+        df.to_csv(path, index=False)
+    return partition
@@ -18,9 +18,25 @@ from collections import defaultdict
 import matplotlib.pyplot as plt
 from matplotlib.patches import Circle
 import networkx as nx
+import numpy as np
 import pandas as pd
-import community as community_louvain   # pip install python-louvain
-from sklearn.preprocessing import MinMaxScaler
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import eigs, eigsh
+
+from layout_cache import cached_layout
+from louvain_backends import LOUVAIN_BACKEND, louvain_partition, to_networkit
+from pagerank_csr import pagerank_csr
+from partition_cache import cached_partition
+
+try:
+    import igraph as ig   # optional: C betweenness
+except ImportError:
+    ig = None
+
+try:
+    import networkit as nk   # optional: sampled betweenness on large graphs
+except ImportError:
+    nk = None
 
 # Config
 EDGES_CSV = "edges.csv"       # default filename (script will search for it)
@@ -29,6 +45,9 @@ OUT_PREFIX = "per_community"
 RANDOM_SEED = 42
 SAMPLE_SIZE = 250             # If graph larger than ~300, we will sample down to this many nodes
 MIN_PER_COMMUNITY = 2         # ensure at least this many nodes per community during sampling
+BETWEENNESS_EXACT_MAX_NODES = 5000   # larger graphs use networkit's sampled estimate when installed
+LAYOUT_CACHE_DIR = os.path.join(".cache", "layouts")   # layout_cache results, reused across runs
+SEARCH_SKIP_DIRS = {".git", "__pycache__", "node_modules", ".venv", "venv", ".mypy_cache", ".cache", ".idea"}
 
 random.seed(RANDOM_SEED)
 
@@ -48,9 +67,11 @@ def find_file_in_tree(filename, search_roots=None):
     for root in search_roots:
         if not root:
             continue
-        for dirpath, _dirs, files in os.walk(root):
+        for dirpath, dirs, files in os.walk(root):
             if filename in files:
                 return os.path.join(dirpath, filename)
+            # prune in place so os.walk never descends into VCS / cache / env folders
+            dirs[:] = [d for d in dirs if d not in SEARCH_SKIP_DIRS]
     return None
 
 
@@ -66,26 +87,69 @@ def load_graph(edges_csv_path=None):
     df = pd.read_csv(edges_csv_path)
     # detect column names: prefer source,target
     if {"source", "target"}.issubset(df.columns):
-        edges = df[["source", "target"]].values.tolist()
+        ends = df[["source", "target"]].to_numpy()
     elif {"u", "v"}.issubset(df.columns):
-        edges = df[["u", "v"]].values.tolist()
+        ends = df[["u", "v"]].to_numpy()
     else:
         # fallback: use first two columns
-        edges = df.iloc[:, :2].values.tolist()
+        ends = df.iloc[:, :2].to_numpy()
+    # one tolist() per column instead of a list per row; edge (and so node) order is unchanged
     G = nx.Graph()
-    G.add_edges_from(edges)
+    G.add_edges_from(zip(ends[:, 0].tolist(), ends[:, 1].tolist()))
     return G, edges_csv_path
 
 
+def betweenness(G):
+    """
+    Normalized betweenness as nx.betweenness_centrality(G): networkit's sampled
+    estimate on graphs above BETWEENNESS_EXACT_MAX_NODES, else exact Brandes in
+    C via igraph, else networkx.
+    """
+    n = G.number_of_nodes()
+    if nk is not None and n > BETWEENNESS_EXACT_MAX_NODES:
+        Gk, nodes = to_networkit(G)
+        bc = nk.centrality.EstimateBetweenness(Gk, max(50, int(math.log2(n) * 10)), True, True)
+        bc.run()
+        return dict(zip(nodes, bc.scores()))
+    if ig is not None and n > 2:
+        nodes = list(G)
+        idx = {n: i for i, n in enumerate(nodes)}
+        g_ig = ig.Graph(n=len(nodes), edges=[(idx[u], idx[v]) for u, v in G.edges()])
+        # igraph counts each undirected pair once; nx normalizes by (n-1)(n-2)/2 pairs
+        scale = 2.0 / ((n - 1) * (n - 2))
+        return dict(zip(nodes, (np.asarray(g_ig.betweenness(directed=False)) * scale).tolist()))
+    return nx.betweenness_centrality(G)
+
+
+def arpack_eigenvector(A, symmetric=False):
+    """
+    nx.eigenvector_centrality_numpy on a prebuilt adjacency; raises
+    nx.AmbiguousSolution for a disconnected graph, as networkx does. A symmetric
+    (undirected) adjacency goes through Lanczos (eigsh) rather than Arnoldi.
+    """
+    if connected_components(A, directed=False)[0] != 1:
+        raise nx.AmbiguousSolution("eigenvector centrality is ambiguous on a disconnected graph")
+    if symmetric:
+        _, vec = eigsh(A, k=1, which="LA", tol=0)
+    else:
+        _, vec = eigs(A.T, k=1, which="LR", maxiter=50, tol=0)
+    largest = vec.ravel().real
+    return largest / (np.sign(largest.sum()) * np.linalg.norm(largest))
+
+
 def compute_features(G, users_df=None):
     deg = dict(G.degree())
-    pr = nx.pagerank(G)
+    # one CSR build shared by PageRank (weighted, as nx.pagerank) and eigenvector (unweighted)
+    nodes = list(G)
+    W = nx.to_scipy_sparse_array(G, nodelist=nodes, weight="weight", dtype=float, format="csr") if nodes else None
+    pr = dict(zip(nodes, pagerank_csr(W).tolist())) if nodes else {}
     try:
-        eig = nx.eigenvector_centrality_numpy(G)
+        A = W.copy()
+        A.data[:] = 1.0
+        eig = dict(zip(nodes, arpack_eigenvector(A, symmetric=not G.is_directed()).tolist()))
     except Exception:
-        eig = {n: 0.0 for n in G.nodes()}
-    # betweenness centrality (may be slow for large graphs)
-    between = nx.betweenness_centrality(G)
+        eig = {n: 0.0 for n in nodes}
+    between = betweenness(G)
 
     # homophily placeholder (will be overwritten if users_df has attributes)
     homophily = {n: 0.0 for n in G.nodes()}
@@ -107,36 +171,34 @@ def compute_features(G, users_df=None):
     return df
 
 
-def detect_louvain(G):
-    partition = community_louvain.best_partition(G)
-    return partition
-
-
 def structural_homophily_by_community(G, partition, df):
-    # compute fraction of neighbors in same detected community
-    for n in G.nodes():
-        neigh = list(G.neighbors(n))
-        if not neigh:
-            df.at[n, "homophily"] = 0.0
-            continue
-        same = sum(1 for v in neigh if partition.get(v) == partition.get(n))
-        df.at[n, "homophily"] = same / len(neigh)
+    # compute fraction of neighbors in same detected community, as one scan over CSR arrays
+    # (read straight from G.adj: nx.to_scipy_sparse_array costs more than the old loop)
+    nodes = list(G)
+    idx = {n: i for i, n in enumerate(nodes)}
+    adj = G.adj
+    n_neigh = np.fromiter((len(adj[n]) for n in nodes), dtype=np.int64, count=len(nodes))
+    nbrs = np.fromiter((idx[v] for n in nodes for v in adj[n]), dtype=np.int64, count=int(n_neigh.sum()))
+    src = np.repeat(np.arange(len(nodes)), n_neigh)
+    codes = {}   # community -> int code; nodes missing from the partition share one code
+    comm = np.array([codes.setdefault(partition.get(n), len(codes)) for n in nodes], dtype=np.int64)
+    same = np.bincount(src, weights=comm[nbrs] == comm[src], minlength=len(nodes))
+    frac = np.divide(same, n_neigh, out=np.zeros(len(nodes)), where=n_neigh > 0)
+    df["homophily"] = pd.Series(frac, index=nodes)
     return df
 
 
 def normalize_and_score(df, weights=None):
     if weights is None:
         weights = {"pagerank": 0.35, "degree": 0.25, "betweenness": 0.15, "eigenvector": 0.10, "homophily": 0.15}
-    scaler = MinMaxScaler()
     numeric_cols = ["degree", "pagerank", "eigenvector", "betweenness", "homophily"]
-    scaled_vals = scaler.fit_transform(df[numeric_cols].fillna(0.0))
-    scaled = pd.DataFrame(scaled_vals, index=df.index, columns=numeric_cols)
+    # column-wise (x - min) / (max - min), constant columns -> 0 (what MinMaxScaler did)
+    X = df[numeric_cols].fillna(0.0).to_numpy(dtype=np.float64)
+    mn, mx = X.min(axis=0), X.max(axis=0)
+    scaled = (X - mn) / np.where(mx > mn, mx - mn, 1.0)
     df = df.copy()
-    df["influence"] = 0.0
-    for k, w in weights.items():
-        df["influence"] += scaled[k] * w
-    for c in numeric_cols:
-        df[c + "_norm"] = scaled[c]
+    df["influence"] = scaled @ np.array([weights.get(c, 0.0) for c in numeric_cols])
+    df[[c + "_norm" for c in numeric_cols]] = scaled
     return df
 
 
@@ -170,24 +232,16 @@ def sample_nodes_preserve_communities(partition_full, total_budget):
 
 
 def select_leader_deputy(df, partition):
-    comm_members = defaultdict(list)
-    for n, comm in partition.items():
-        comm_members[comm].append(n)
-
-    rows = []
-    for comm, members in sorted(comm_members.items()):
-        members_sorted = sorted(members, key=lambda n: df.at[n, "influence"], reverse=True)
-        leader = members_sorted[0] if len(members_sorted) >= 1 else None
-        deputy = members_sorted[1] if len(members_sorted) >= 2 else None
-        if leader is not None:
-            rows.append({"community": comm, "role": "Leader", "node": leader,
-                         "influence": float(df.at[leader, "influence"]),
-                         "degree": int(df.at[leader, "degree"])})
-        if deputy is not None:
-            rows.append({"community": comm, "role": "Deputy", "node": deputy,
-                         "influence": float(df.at[deputy, "influence"]),
-                         "degree": int(df.at[deputy, "degree"])})
-    return pd.DataFrame(rows)
+    # top two members by influence per community (stable sort: ties keep partition order)
+    comm = pd.Series(partition, name="community")
+    members = df.loc[comm.index, ["influence", "degree"]].assign(community=comm.to_numpy())
+    members = members.rename_axis("node").reset_index()
+    top2 = (members.sort_values(["community", "influence"], ascending=[True, False], kind="stable")
+            .groupby("community", sort=False).head(2))
+    top2["role"] = np.where(top2.groupby("community").cumcount() == 0, "Leader", "Deputy")
+    top2["influence"] = top2["influence"].astype(float)
+    top2["degree"] = top2["degree"].astype(int)
+    return top2[["community", "role", "node", "influence", "degree"]].reset_index(drop=True)
 
 
 def save_communities_csv(partition, out_csv):
@@ -219,36 +273,30 @@ def visualize_communities_with_only_leaders(G_full, partition_full, leader_deput
     - out_png: filename to save
     """
     # 1) compute positions for EVERY node (we won't draw them, only use for centroids)
-    pos = nx.spring_layout(G_full, seed=RANDOM_SEED, iterations=200)
+    pos = cached_layout(G_full, LAYOUT_CACHE_DIR, seed=RANDOM_SEED, iterations=200)
 
     # 2) compute per-community centroid and radius (based on member positions)
-    comm_to_positions = {}
-    for n, c in partition_full.items():
-        # safety: some nodes might be missing in pos if they were isolated; skip them
-        if n not in pos:
-            continue
-        comm_to_positions.setdefault(c, []).append(pos[n])
-
-    comm_centroids = {}
-    comm_radius = {}
-    for c, pts in comm_to_positions.items():
-        xs = [p[0] for p in pts]
-        ys = [p[1] for p in pts]
-        cx = sum(xs) / len(xs)
-        cy = sum(ys) / len(ys)
-        comm_centroids[c] = (cx, cy)
-        maxd = 0.0
-        for x, y in zip(xs, ys):
-            d = math.hypot(x - cx, y - cy)
-            if d > maxd:
-                maxd = d
-        comm_radius[c] = maxd * centroid_scale if maxd > 1e-12 else 0.05
+    # one (N, 2) array of member positions; per-community sums and maxima by community code
+    members = [n for n in partition_full if n in pos]   # isolated nodes may be missing from pos
+    comm_ids, code = np.unique([partition_full[n] for n in members], return_inverse=True)
+    xy = np.array([pos[n] for n in members], dtype=float).reshape(-1, 2)
+    counts = np.bincount(code, minlength=len(comm_ids))
+    centroids = np.column_stack([np.bincount(code, weights=xy[:, k], minlength=len(comm_ids))
+                                 for k in range(2)]) / counts[:, None]
+    maxd = np.zeros(len(comm_ids))
+    np.maximum.at(maxd, code, np.hypot(*(xy - centroids[code]).T))
+    radius = np.where(maxd > 1e-12, maxd * centroid_scale, 0.05)
+
+    comm_centroids = {c: (float(x), float(y)) for c, (x, y) in zip(comm_ids.tolist(), centroids)}
+    comm_radius = dict(zip(comm_ids.tolist(), radius.tolist()))
 
     # 3) prepare colors
     comms = sorted(comm_centroids.keys())
     ncomms = len(comms)
     cmap = plt.get_cmap("tab20") if ncomms <= 20 else plt.get_cmap("tab20b")
     color_map = {c: cmap(i % cmap.N) for i, c in enumerate(comms)}
+    comm_colors = np.array([color_map[c] for c in comms]).reshape(-1, 4)   # RGBA row per dense community id
+    comm_index = {c: i for i, c in enumerate(comms)}
 
     # 4) build figure and draw community patches (no nodes)
     fig, ax = plt.subplots(figsize=(14, 9))
@@ -270,26 +318,26 @@ def visualize_communities_with_only_leaders(G_full, partition_full, leader_deput
     leaders = [n for n in leaders if n in pos]
     deputies = [n for n in deputies if n in pos]
 
+    def role_points(nodes):
+        """(N, 2) positions and (N, 4) colours, gathered from the per-community colour table."""
+        xy = np.array([pos[n] for n in nodes], dtype=float).reshape(-1, 2)
+        return xy, comm_colors[[comm_index[partition_full[n]] for n in nodes]]
+
     # deputy scatter (diamond)
     if deputies:
-        dx = [pos[n][0] for n in deputies]
-        dy = [pos[n][1] for n in deputies]
-        dcolors = [color_map[partition_full[n]] for n in deputies]
-        ax.scatter(dx, dy, s=base_deputy_size, marker='D', edgecolors='k', linewidths=0.9,
+        dxy, dcolors = role_points(deputies)
+        ax.scatter(dxy[:, 0], dxy[:, 1], s=base_deputy_size, marker='D', edgecolors='k', linewidths=0.9,
                    c=dcolors, zorder=3, label='Deputy')
 
     # leader scatter (star)
     if leaders:
-        lx = [pos[n][0] for n in leaders]
-        ly = [pos[n][1] for n in leaders]
-        lcolors = [color_map[partition_full[n]] for n in leaders]
-        ax.scatter(lx, ly, s=base_leader_size, marker='*', edgecolors='k', linewidths=1.2,
+        lxy, lcolors = role_points(leaders)
+        ax.scatter(lxy[:, 0], lxy[:, 1], s=base_leader_size, marker='*', edgecolors='k', linewidths=1.2,
                    c=lcolors, zorder=4, label='Leader')
 
     # 6) optionally label leaders with their node id (small, above the marker)
-    if label_leaders:
-        for n in leaders:
-            x, y = pos[n]
+    if label_leaders and leaders:
+        for n, (x, y) in zip(leaders, lxy.tolist()):
             ax.text(x, y + 0.01, str(n), fontsize=8, fontweight='bold', ha='center', zorder=5)
 
     # 7) aesthetics: no axes, tight, legend shows only Leader/Deputy + maybe few communities
@@ -328,7 +376,7 @@ def main():
         users_df = None
 
     # 3) detect communities on full graph to guide sampling
-    partition_full = detect_louvain(G_full)
+    partition_full = cached_partition(G_full, used_path, louvain_partition, LOUVAIN_BACKEND)   # shared with the top-200 plot
     n_full = G_full.number_of_nodes()
     print(f"Full graph: {n_full} nodes, {G_full.number_of_edges()} edges. Detected {len(set(partition_full.values()))} communities (on full graph).")
 
@@ -349,14 +397,14 @@ def main():
                 chosen = random.sample(members, q)
             sampled_nodes.extend(chosen)
         sampled_nodes = sorted(set(sampled_nodes))
-        G = G_full.subgraph(sampled_nodes).copy()
+        G = nx.induced_subgraph(G_full, sampled_nodes)   # read-only view; nothing downstream mutates G
         print(f"Sampled subgraph: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges (budget {budget}).")
     else:
         G = G_full
         print("Using full graph (no sampling).")
 
     # 5) run Louvain on the graph we'll use (sampled or full)
-    partition = detect_louvain(G)
+    partition = louvain_partition(G)
     print(f"Using {len(set(partition.values()))} communities for selection/visualization.")
 
     # 6) compute features and homophily
@@ -6,10 +6,13 @@ import pandas as pd
 import networkx as nx
 import matplotlib.pyplot as plt
 import numpy as np
-from collections import defaultdict
-from community import community_louvain
 from sklearn.neighbors import NearestNeighbors
 
+from layout_cache import cached_layout
+from louvain_backends import LOUVAIN_BACKEND, louvain_partition
+from node_ids import edge_id_columns
+from partition_cache import cached_partition
+
 # ---------------- CONFIG ----------------
 EDGES_PATH = r'C:\Users\p2123\Desktop\COLLEGE\PROJECT_3rdYear\Social_Network_Project\data\edges.csv'
 INFLUENCE_PATH = r'C:\Users\p2123\Desktop\COLLEGE\PROJECT_3rdYear\Social_Network_Project\data\influence_scores_formula.csv'
@@ -17,6 +20,8 @@ OUT_IMG = r'C:\Users\p2123\Desktop\COLLEGE\PROJECT_3rdYear\Social_Network_Projec
 OUT_LEADERS_CSV = r'C:\Users\p2123\Desktop\COLLEGE\PROJECT_3rdYear\Social_Network_Project\data\corrected_per_community_leaders.csv'
 OUT_SAMPLE_CSV = r'C:\Users\p2123\Desktop\COLLEGE\PROJECT_3rdYear\Social_Network_Project\data\sampled_nodes_for_visualization.csv'
 
+LAYOUT_CACHE_DIR = os.path.join(os.path.dirname(OUT_IMG), '.cache', 'layouts')
+
 TARGET_SAMPLE = 200
 RANDOM_SEED = 42
 
@@ -34,17 +39,12 @@ def load_edges_build_graph(edges_path):
     else:
         src_col, dst_col = df.columns[0], df.columns[1]
 
-    edges = []
-    for _, row in df.iterrows():
-        u, v = row[src_col], row[dst_col]
-        try:
-            u = str(int(u)); v = str(int(v))
-        except:
-            u, v = str(u), str(v)
-        edges.append((u, v))
+    # ids as str(int(x)), falling back to str(x); as in the old per-row loop the
+    # target keeps str(x) whenever either end fails, the source only when it fails
+    u, v = edge_id_columns(df[src_col], df[dst_col])
 
     G = nx.Graph()
-    G.add_edges_from(edges)
+    G.add_edges_from(zip(u.tolist(), v.tolist()))
     return G
 
 
@@ -76,6 +76,21 @@ def mean_nearest_dist(pos):
     return float(dist[:,1].mean())
 
 
+def select_layout(G_sub):
+    """800-iteration spring layout or Kamada-Kawai, whichever spreads nodes further apart."""
+    k_auto = 2.0 / math.sqrt(max(1, G_sub.number_of_nodes()))
+    pos_spring = nx.spring_layout(G_sub, seed=42, k=k_auto, iterations=800, scale=3.0)
+    score_spring = mean_nearest_dist(pos_spring)
+
+    try:
+        pos_kk = nx.kamada_kawai_layout(G_sub)
+        score_kk = mean_nearest_dist(pos_kk)
+    except:
+        pos_kk, score_kk = None, -1
+
+    return pos_kk if score_kk > score_spring else pos_spring
+
+
 # ---------------- MAIN ----------------
 def main():
     print("Loading graph...")
@@ -85,45 +100,38 @@ def main():
     inf_df, node_col, score_col, scores_map = read_influence(INFLUENCE_PATH)
 
     print("Running Louvain...")
-    partition_full = community_louvain.best_partition(G_full)
-
-    comm_members = defaultdict(list)
-    for n, c in partition_full.items():
-        comm_members[c].append(n)
+    partition_full = cached_partition(G_full, EDGES_PATH, louvain_partition, LOUVAIN_BACKEND)   # shared with select_leader_deputy
 
     print("Selecting leaders...")
-    leaders = []
-    for c, members in comm_members.items():
-        best_node, best_score = None, -1
-        for m in members:
-            s = scores_map.get(str(m))
-            if s is None: continue
-            if s > best_score:
-                best_score = s
-                best_node = str(m)
-        if best_node:
-            leaders.append(best_node)
+    # highest-scoring member per community (first one on ties); unscored nodes never lead
+    nodes = np.array([str(n) for n in partition_full], dtype=object)
+    score = np.fromiter((scores_map.get(n, np.nan) for n in nodes), dtype=float, count=len(nodes))
+    comm = np.fromiter(partition_full.values(), dtype=np.int64, count=len(nodes))
+    scored = np.flatnonzero(score > -1)
+    best = pd.Series(score[scored]).groupby(comm[scored], sort=False).idxmax().to_numpy()
+    leaders = nodes[scored[best]].tolist()
 
     leaders = sorted(set(leaders), key=lambda x: int(x))
     print("Leaders:", len(leaders))
 
     top_nodes = inf_df[node_col].astype(str).tolist()
     sample = []
+    sample_set = set()   # membership checks; sample keeps the order
 
     for L in leaders:
-        if L not in sample:
-            sample.append(L)
+        if L not in sample_set:
+            sample.append(L); sample_set.add(L)
 
     for n in top_nodes:
         if len(sample) >= TARGET_SAMPLE: break
-        if n not in sample:
-            sample.append(n)
+        if n not in sample_set:
+            sample.append(n); sample_set.add(n)
 
     if len(sample) < TARGET_SAMPLE:
         for n in G_full.nodes():
             n = str(n)
-            if n not in sample:
-                sample.append(n)
+            if n not in sample_set:
+                sample.append(n); sample_set.add(n)
             if len(sample) >= TARGET_SAMPLE:
                 break
 
@@ -132,17 +140,7 @@ def main():
     G_sub = G_full.subgraph(sample).copy()
 
     print("Selecting layout...")
-    k_auto = 2.0 / math.sqrt(max(1, G_sub.number_of_nodes()))
-    pos_spring = nx.spring_layout(G_sub, seed=42, k=k_auto, iterations=800, scale=3.0)
-    score_spring = mean_nearest_dist(pos_spring)
-
-    try:
-        pos_kk = nx.kamada_kawai_layout(G_sub)
-        score_kk = mean_nearest_dist(pos_kk)
-    except:
-        pos_kk, score_kk = None, -1
-
-    pos = pos_kk if score_kk > score_spring else pos_spring
+    pos = cached_layout(G_sub, LAYOUT_CACHE_DIR, layout=select_layout)
 
     # ---------------- DRAWING ----------------
     plt.figure(figsize=(14, 10))
@@ -157,7 +155,8 @@ def main():
     )
 
     # ❗ DARKER background nodes
-    non_leaders = [n for n in G_sub.nodes() if n not in leaders]
+    leaders_set = set(leaders)
+    non_leaders = [n for n in G_sub.nodes() if n not in leaders_set]
     nx.draw_networkx_nodes(
         G_sub, pos,
         nodelist=non_leaders,
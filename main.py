@@ -1,11 +1,37 @@
 # main.py
+import os
+import runpy
 import subprocess
+import sys
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "DB_StarterPack")
+
+
+def run_script(name):
+    """
+    Run a DB_StarterPack script as __main__ in this interpreter, so pandas /
+    networkx / sklearn are imported once instead of per run. `python main.py
+    --subprocess` keeps the old fresh-interpreter-per-script behaviour.
+    """
+    if "--subprocess" in sys.argv:
+        subprocess.run(["python", f"DB_StarterPack/{name}"])
+        return
+    path = os.path.join(SCRIPTS_DIR, name)
+    if not os.path.exists(path):
+        print(f"❌ Script not found: {path}")
+        return
+    sys.path.insert(0, SCRIPTS_DIR)   # sibling imports resolve as under `python DB_StarterPack/<name>`
+    try:
+        runpy.run_path(path, run_name="__main__")
+    finally:
+        sys.path.remove(SCRIPTS_DIR)
+
 
 def run_generate_network():
-    subprocess.run(["python", "DB_StarterPack/generate_network.py"])
+    run_script("generate_network.py")
 
 def run_influence_analysis():
-    subprocess.run(["python", "DB_StarterPack/influence_analysis.py"])
+    run_script("influence_analysis.py")
 
 if __name__ == "__main__":
     print("\n=== Social Network Project ===")